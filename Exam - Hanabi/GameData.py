@@ -1,7 +1,5 @@
 # Data to be passed from client to server
-import pickle
-
-from constants import DATASIZE
+from constants import DATASIZE, HEADERSIZE
 
 # Generic object
 class GameData(object):
@@ -10,23 +8,74 @@ class GameData(object):
         self.sender = sender
 
     def serialize(self) -> bytes:
-        data = pickle.dumps(self)
-        datalen = len(data)
-        binaryDataLen: bytes  = datalen.to_bytes(2, 'little')
-        totdata = bytearray(binaryDataLen) + data
-        #ensure no multiple data on same request
-        for _ in range(datalen + len(binaryDataLen), DATASIZE):
-            totdata.append(0)
-        data = bytes(totdata)
-        assert(len(data) == DATASIZE)
-        return data
+        # frames are length-prefixed and sent back to back, no padding
+        import codec # codec needs the classes of this module, import it lazily
+        data = codec.encode(self)
+        return len(data).to_bytes(HEADERSIZE, 'little') + data
 
     def deserialize(serialized: bytes):
-        binarySize = serialized[0:2]
-        assert(len(binarySize) == 2)
+        binarySize = serialized[0:HEADERSIZE]
+        assert(len(binarySize) == HEADERSIZE)
         datasize = int.from_bytes(binarySize, 'little')
-        data = serialized[2:datasize + 2]
-        return pickle.loads(data)
+        data = serialized[HEADERSIZE:datasize + HEADERSIZE]
+        assert(len(data) == datasize)
+        import codec
+        return codec.decode(data)
+
+
+class FrameReader(object):
+    '''
+    Rebuilds the GameData frames from a stream socket.
+    A single recv can hold a partial frame or several frames,
+    so the bytes are buffered until a whole frame is available.
+    conn: the socket to read from (optional if the bytes are fed by hand).
+    '''
+    def __init__(self, conn=None) -> None:
+        super().__init__()
+        self.conn = conn
+        self.__buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        self.__buffer += chunk
+
+    def nextFrame(self):
+        '''
+        Pops the next complete frame (header included) from the buffer.
+        Returns None if no complete frame is available yet.
+        '''
+        if len(self.__buffer) < HEADERSIZE:
+            return None
+        framesize = HEADERSIZE + int.from_bytes(self.__buffer[0:HEADERSIZE], 'little')
+        if len(self.__buffer) < framesize:
+            return None
+        frame = bytes(self.__buffer[0:framesize])
+        del self.__buffer[0:framesize]
+        return frame
+
+    def frames(self) -> list:
+        '''
+        Pops all the complete frames from the buffer.
+        '''
+        frames = []
+        frame = self.nextFrame()
+        while frame is not None:
+            frames.append(frame)
+            frame = self.nextFrame()
+        return frames
+
+    def recv(self):
+        '''
+        Returns the next GameData object read from the socket, blocking until it is complete.
+        Returns None if the connection has been closed.
+        '''
+        frame = self.nextFrame()
+        while frame is None:
+            chunk = self.conn.recv(DATASIZE)
+            if not chunk:
+                return None
+            self.feed(chunk)
+            frame = self.nextFrame()
+        return GameData.deserialize(frame)
 
 
 # Client to server
@@ -55,9 +104,17 @@ class ClientPlayerAddData(ClientToServerData):
     '''
     A connection request from client to server.
     The client requests the server to be added to the lobby.
+    pushState: if True, after every action the server also sends the new game state
+        (a ServerGameStateDelta from the last state sent), so there is no need to ask for it.
+    room: the id of the room to join (it is created if it does not exist).
+        If None, the lobby puts the player in a table with numPlayers players.
+    numPlayers: the number of players of the table, None for the server default.
     '''
-    def __init__(self, sender) -> None:
+    def __init__(self, sender, pushState=False, room=None, numPlayers=None) -> None:
         action = "Connection request"
+        self.pushState = pushState
+        self.room = room
+        self.numPlayers = numPlayers
         super().__init__(sender, action)
 
 class ClientPlayerStartRequest(ClientToServerData):
@@ -81,9 +138,12 @@ class ClientPlayerReadyData(ClientToServerData):
 class ClientGetGameStateRequest(ClientToServerData):
     '''
     Used to retrieve the game state.
+    version: the version of the last game state received, to get only the changes since then
+        (see ServerGameStateDelta). None to get the full state.
     '''
-    def __init__(self, sender) -> None:
+    def __init__(self, sender, version=None) -> None:
         action = "Show cards request"
+        self.version = version
         super().__init__(sender, action)
 
 class ClientPlayerDiscardCardRequest(ClientToServerData):
@@ -108,6 +168,18 @@ class ClientPlayerPlayCardRequest(ClientToServerData):
         self.handCardOrdered = handCardOrdered
         super().__init__(sender, action)
 
+class ClientSpectatorAddData(ClientToServerData):
+    '''
+    A request to watch a room without taking a seat, sent instead of ClientPlayerAddData.
+    The spectator gets every message the server sends to all the players of the room
+    (game start, results of the actions, game over), and can't send anything else.
+    room: the id of the room to watch, it must exist.
+    '''
+    def __init__(self, sender, room) -> None:
+        action = "Spectator request"
+        self.room = room
+        super().__init__(sender, action)
+
 # Server to client
 class ServerToClientData(GameData):
     def __init__(self, action) -> None:
@@ -143,10 +215,24 @@ class ServerPlayerConnectionOk(ServerToClientData):
     '''
     Server successfully received the connection request from the player.
     You need to tell the server that you are ready.
+    room: the id of the room the player has been put in.
     '''
-    def __init__(self, playerName) -> None:
+    def __init__(self, playerName, room=None) -> None:
         action = "Connection ok"
         self.message = "Player " + str(playerName) + " connected succesfully!"
+        self.room = room
+        super().__init__(action)
+
+class ServerSpectatorConnectionOk(ServerToClientData):
+    '''
+    The server accepted a spectator.
+    room: the id of the room watched.
+    players: the names of the players of the room.
+    '''
+    def __init__(self, room, players) -> None:
+        action = "Spectator ok"
+        self.room = room
+        self.players = players
         super().__init__(action)
 
 class ServerPlayerStartRequestAccepted(ServerToClientData):
@@ -182,9 +268,10 @@ class ServerGameStateData(ServerToClientData):
     usedStormTokens: used red (storm) tokens. 0 is the minimum, 3 is the maximum. At 3 the game is over.
     tableCards: shows the cards that are currently being played (forming the current firework).
     discardPile: shows the discard pile.
+    version: the version of this state, to send back with the next request.
     NOTE: params might get added on request, if the game allows for it.
     '''
-    def __init__(self, currentPlayer: str, handSize: int, players: list, usedNoteTokens: int, usedStormTokens: int, table: list, discard: list) -> None:
+    def __init__(self, currentPlayer: str, handSize: int, players: list, usedNoteTokens: int, usedStormTokens: int, table: list, discard: list, version=None) -> None:
         action = "Show cards response"
         self.currentPlayer = currentPlayer
         self.handSize = handSize
@@ -193,8 +280,46 @@ class ServerGameStateData(ServerToClientData):
         self.usedStormTokens = usedStormTokens
         self.tableCards = table
         self.discardPile = discard
+        self.version = version
         super().__init__(action)
 
+class ServerGameStateDelta(ServerToClientData):
+    '''
+    The changes of the game state since the version sent with the request.
+    baseVersion: the version the changes start from.
+    version: the version of the new state.
+    currentPlayer, handSize, usedNoteTokens, usedStormTokens: as in ServerGameStateData.
+    players: only the players whose hand changed, the requesting player is never there.
+    tableCards: only the cards added to the table, by color.
+    discardPile: only the cards added to the discard pile.
+    Use apply to get the full ServerGameStateData.
+    '''
+    def __init__(self, baseVersion: int, version: int, currentPlayer: str, handSize: int, players: list, usedNoteTokens: int, usedStormTokens: int, table: dict, discard: list) -> None:
+        action = "Show cards changes response"
+        self.baseVersion = baseVersion
+        self.version = version
+        self.currentPlayer = currentPlayer
+        self.handSize = handSize
+        self.players = players
+        self.usedNoteTokens = usedNoteTokens
+        self.usedStormTokens = usedStormTokens
+        self.tableCards = table
+        self.discardPile = discard
+        super().__init__(action)
+
+    def apply(self, state: ServerGameStateData) -> ServerGameStateData:
+        '''
+        Returns the new state, given the state with version baseVersion.
+        '''
+        assert(state.version == self.baseVersion)
+        changed = {p.name: p for p in self.players}
+        players = [changed.get(p.name, p) for p in state.players]
+        table = {}
+        for color in state.tableCards:
+            table[color] = state.tableCards[color] + self.tableCards.get(color, [])
+        discard = state.discardPile + self.discardPile
+        return ServerGameStateData(self.currentPlayer, self.handSize, players, self.usedNoteTokens, self.usedStormTokens, table, discard, self.version)
+
 
 class ServerActionValid(ServerToClientData):
     '''
@@ -1,24 +1,56 @@
-from moves import selectMoves
+from moves import moveDtype, selectMoves
 import GameData
 import numpy as np
 import copy 
 
 players = 0  #number of players
 colors = ["red","white","blue","yellow","green"] #list used as correspondance color -> index
-table = [0,0,0,0,0]                         #table with currently played cards
-deckAvailableOthers = np.array([            #number of cards in the deck for which all players know the status
-                        [3,3,3,3,3],
-                        [2,2,2,2,2],
-                        [2,2,2,2,2],
-                        [2,2,2,2,2],
-                        [1,1,1,1,1]
-                    ], dtype = "uint") 
-population = []                             #selected moves in the play/discard type
-hintMoves = []                              #selected moves in hint type 
-hint = 0                                    #used hints -> blue tokens utilized
-errors = 0                                  #number of red tokens 
-memory = []                                 #list used to check if we already counted in our deck the cards of which 
-                                            #we have perfect informations
+
+
+
+#######################################################################################################################
+#
+# Function to calculate the states of the cards of a color (see Player.states)
+#
+# Args:
+#  
+#   - height: value of the top card of the firework
+#   - counts: number of cards of every value not played or discarded yet
+#
+# Return: 
+# 
+#   - states: list with the state of every value
+#
+#######################################################################################################################
+
+def colorStates(height, counts):
+    states = [0, 0, 0, 0, 0]
+    for i in range(5):
+        if counts[i] != 0:                                      #if there are still cards in play
+            play = (i == height)
+            if i + 1 <= height:
+                crit = False
+            elif i > height and min(states[height:i]) == 0:     #a card below is not in game anymore
+                crit = False
+                play = False
+            else:
+                crit = counts[i] == 1
+            if not crit and not play:                           #discardable
+                states[i] = 1
+            elif crit and not play:                             #critical not playable
+                states[i] = 3
+            elif play and not crit:                             #playable not critical
+                states[i] = 2
+            else:
+                states[i] = 4                                   #playable and critical
+    return states
+
+
+countWeights = np.array([54, 18, 6, 2, 1], dtype = "uint")     #index of the counts of a color in cardStates
+cardStates = np.zeros((6, 216, 5), dtype = "uint")             #states of a color by firework height and counts index
+for counts in np.ndindex(4, 3, 3, 3, 2):
+    for height in range(6):
+        cardStates[height, countWeights @ np.array(counts, dtype = "uint")] = colorStates(height, counts)
 
 
 
@@ -39,7 +71,6 @@ memory = []                                 #list used to check if we already co
 class Card(object):
         
     global colors
-    global memory
     
     value = 0               
     color = ""              
@@ -102,47 +133,131 @@ class Card(object):
     #
     #######################################################################################################################
     
-    def mask(self, probs, deck):                                            #used to constuct a masked array of the deck, 
-                                                                            #where cards with probability 0 are removed
-        res2 = np.ma.make_mask(probs)                                       #init mask with probabilities
-        res3 = np.ma.masked_array(deck, np.invert(res2), fill_value = 0)    #mask elements and filter out impossible occurrences
-        return res3.filled()                                                #masked values are swapped with fill_value
-    
+    def mask(self, probs, deck):                                            #cards with probability 0 are removed from 
+        return deck * (probs != 0)                                          #the deck, works on whole hands too
+        
+             
+                
+#######################################################################################################################
+#
+# Class Hand: the cards of a hand with their probability matrices stacked in a single array, so that the
+# calculations are done on all the cards at once
+# The probs of every Card of the hand is a view on its row of the array
+#   
+# Attributes:
+#   - cards: list of the Card objects, in hand order
+#   - probs: array (cards, 5, 5) with the probability matrix of every card
+# 
+#######################################################################################################################
+
+class Hand(object):
+
+    global colors
+
+
+
+    #######################################################################################################################
+    #
+    # Constructor 
+    #
+    # Args:
+    #   - cards: Card objects in the hand
+    #
+    #######################################################################################################################
+
+    def __init__(self, cards=()) -> None:
+        super().__init__()
+        self.cards = list(cards)
+        self.bind()
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, i):
+        return self.cards[i]
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def index(self, card):
+        return self.cards.index(card)
+
+    def append(self, card):
+        self.cards.append(card)
+        self.bind()
+
+    def pop(self, i):
+        card = self.cards.pop(i)
+        self.bind()
+        return card
+
+
+
+    #######################################################################################################################
+    #
+    # Function to stack the matrices of the cards in the array, after the hand has changed
+    #
+    #######################################################################################################################
+
+    def bind(self):
+        self.probs = np.array([card.probs for card in self.cards], dtype = "float").reshape(len(self.cards), 5, 5)
+        for i, card in enumerate(self.cards):
+            card.probs = self.probs[i]
+
+
 
-    
     #######################################################################################################################
     #
-    # Function to calculate the probability matrix Probs, if any relevant change happens
+    # Function to save the state of the cards, restored by restore
+    #
+    #######################################################################################################################
+
+    def save(self):
+        return (self.probs.copy(), [(card.value, card.color) for card in self.cards])
+
+    def restore(self, saved, start=0):
+        self.probs[start:] = saved[0][start:]
+        for i in range(start, len(self.cards)):
+            self.cards[i].value, self.cards[i].color = saved[1][i]
+
+
+
+    #######################################################################################################################
+    #
+    # Function to calculate the probability matrices of the cards, if any relevant change happens
     #
     # Args:
     #  
     #   - deck: deck matrix utilized for the calculation, 
     #       can be deckAvailableSelf for the player or deckAvailableOthers for the teammates
+    #   - rows: indexes of the cards to update (default all)
     #
     # Return: 
     # 
     #   - none
     #
     #######################################################################################################################
-    
-    def calcProb(self, deck):
-        if self.value == 0 or self.color == "":         #the calculation is not done if we already know all about the card
-            tot = 0
-            m = self.mask(self.probs, deck)
-            tot = np.sum(m)
-            self.probs = m/tot
-            if self.probs.max() == 1.0:                 #manage the case in which the new probabilities are 1 for a single card
-                indexes = np.where(self.probs == 1.0)   
-                row = indexes[0][0]
-                col = indexes[1][0]
-                self.value = row + 1
-                self.color = colors[col]
-            
 
-            
+    def calcProb(self, deck, rows=None):
+        if rows is None:
+            rows = range(len(self.cards))
+        rows = [i for i in rows if self.cards[i].value == 0 or self.cards[i].color == ""]    #the calculation is not done 
+        if len(rows) == 0:                                                                    #if we already know all
+            return
+        m = deck * (self.probs[rows] != 0)                                                   #same as Card.mask
+        probs = m / np.sum(m, axis = (1, 2), keepdims = True)
+        self.probs[rows] = probs
+        probs = probs.reshape(len(rows), 25)
+        for k in np.where(probs.max(axis = 1) == 1.0)[0]:       #manage the cards whose new probabilities are 1 for a single card
+            row, col = divmod(np.argmax(probs[k] == 1.0), 5)
+            self.cards[rows[k]].value = row + 1
+            self.cards[rows[k]].color = colors[col]
+
+
+
     #######################################################################################################################
     #
-    # Function to calculate ne card probabilities with received hint and new information
+    # Function to calculate the new card probabilities with a received hint and new information
     #
     # Args:
     #  
@@ -151,58 +266,62 @@ class Card(object):
     #       + hint.destination      player to receive hint
     #       + hint.value            number or string (hinted value)
     #       + hint.positions        indexes of target cards in hand
-    #   - mypos: card index in hand
     #   - deck: deck matrix utilized for the calculation, 
     #       can be deckAvailableSelf for the player or deckAvailableOthers for the teammates
+    #   - start: index of the first card to update, the previous ones are left as they are
     #
     # Return: 
     # 
     #   - none
     #
     #######################################################################################################################
-    
-    def calcHint(self, hint, mypos, deck):
-        
-        if hint.type == "value" and self.value == 0:            #hint type selector -> value                            
-            if mypos in hint.positions:                         #card is targeted by hint
-                self.value = hint.value                         #set value of object fo easier access
-                for x in range(5):
-                    if(x != hint.value - 1):                      
-                        self.probs[x, :] = 0                    #set other probabilities to zero
-            else:
-                self.probs[hint.value - 1, :] = 0               #card is not targeted by hint
-                self.calcProb(deck)                             #update probabilities
-                isValue = np.sum(self.probs, axis = 1)          #checks if a value is found by exclusion
-                x = np.where(isValue == 1)[0]
-                if x.size != 0:
-                    self.value = x[0] + 1
-                
-                    
-        elif hint.type == "color" and self.color == "":         #hint type selector -> value
-            if mypos in hint.positions:                         #card is targeted by hint
-                self.color = hint.value                         #set value of object fo easier access
-                for i in range(5):
-                    if colors[i] != hint.value:
-                        self.probs[:,i] = 0                     #set other probabilities to zero
-            else:
-                i = colors.index(hint.value)
-                self.probs[:,i] = 0                             #card is not targeted by hint
-                self.calcProb(deck)                             #update probabilities
-                isColor = np.sum(self.probs, axis = 0)          #checks if a color is found by exclusion
-                y = np.where(isColor == 1)[0]
+
+    def calcHint(self, hint, deck, start=0):
+        rows = range(start, len(self.cards))
+        if hint.type == "value":
+            x = hint.value - 1
+            unknown = [i for i in rows if self.cards[i].value == 0]
+        else:
+            x = colors.index(hint.value)
+            unknown = [i for i in rows if self.cards[i].color == ""]
+        targeted = [i for i in unknown if i in hint.positions]
+        others = [i for i in unknown if i not in hint.positions]
+
+        if hint.type == "value":
+            self.probs[targeted, :x] = 0                        #card is targeted by hint: set other probabilities to zero
+            self.probs[targeted, x + 1:] = 0
+            self.probs[others, x] = 0                           #card is not targeted by hint
+            for i in targeted:
+                self.cards[i].value = hint.value
+        else:
+            self.probs[targeted, :, :x] = 0
+            self.probs[targeted, :, x + 1:] = 0
+            self.probs[others, :, x] = 0
+            for i in targeted:
+                self.cards[i].color = hint.value
+
+        if len(others) != 0:
+            self.calcProb(deck, others)                                                     #update probabilities
+            isFound = np.sum(self.probs[others], axis = 2 if hint.type == "value" else 1) == 1  #checks if a value or a 
+            for k, i in enumerate(others):                                                  #color is found by exclusion
+                y = np.where(isFound[k])[0]
                 if y.size != 0:
-                    self.color=colors[y[0]]
-        self.calcProb(deck)                                     #update probabilities
-        
-             
-                
+                    if hint.type == "value":
+                        self.cards[i].value = y[0] + 1
+                    else:
+                        self.cards[i].color = colors[y[0]]
+        self.calcProb(deck, rows)                                                           #update probabilities
+
+
+
 #######################################################################################################################
 #
 # Class Player: represent the player and all his known informations
 #   
 # Attributes:
-#   - hand: list with 4 to 5 Card objects, reprensent the current hand of the player
+#   - hand: Hand with 4 to 5 Card objects, reprensent the current hand of the player
 #   - name: name of the player
+#   - rng: random generator used to select the moves
 #   - first: boolean used to check if everything is initialized correctly
 #   - toServe: list used to keep track of unmanaged hints
 #   - deckAvailableSelf: matrix that reprensent the current deck, with the infos known by the player
@@ -211,6 +330,7 @@ class Card(object):
 #           + value: known value of the card, at the index 0
 #           + color: known color of the card, at the index 1
 #           + card: card object representing the infos known by the corresponding teammate, at the index 2
+#   - teammateHands: dictionary with the Hand of the card objects of every teammate, by name
 #   - states: matrix representing the game state of any card
 #       The states can be:
 #           + 0: the card is not in the game anymore
@@ -218,37 +338,19 @@ class Card(object):
 #           + 2: the card is playable and not critical
 #           + 3: the card is critical and not playable
 #           + 4: the card is critical and playable
+#   - deckAvailableOthers: number of cards in the deck for which all players know the status
+#   - table: table with currently played cards
+#   - hint: used hints -> blue tokens utilized
+#   - errors: number of red tokens
+#   - memory: list used to check if we already counted in our deck the cards of which we have perfect informations
+#   - population: table of the selected moves in the play/discard type (see moves.moveDtype)
+#   - hintMoves: selected moves in hint type
 # 
 #######################################################################################################################
 
 class Player(object):  
     
-    global hint
-    global errors
     global colors
-    global table
-    global deckAvailableOthers
-    global memory
-    
-    hand = []
-    name = ""
-    first = 0
-    toServe = []
-    deckAvailableSelf = np.array([
-        [3,3,3,3,3],
-        [2,2,2,2,2],
-        [2,2,2,2,2],
-        [2,2,2,2,2],
-        [1,1,1,1,1]
-    ], dtype="uint")
-    teammates= {}
-    states = np.array([   #row = value  column = color
-        [2,2,2,2,2],
-        [1,1,1,1,1],
-        [1,1,1,1,1],
-        [1,1,1,1,1],
-        [3,3,3,3,3]
-    ], dtype="uint")
 
 
 
@@ -259,12 +361,40 @@ class Player(object):
     # Args:
     #   - cards: number of cards of the game, can be 4 or 5 depending of the number of players
     #   - name: name of the player
+    #   - rng: random generator used to select the moves, a seeded one replays the same choices (default np.random)
     #
     #######################################################################################################################
 
-    def __init__(self, cards, name) -> None:
+    def __init__(self, cards, name, rng=np.random) -> None:
         super().__init__()
         self.name = name
+        self.rng = rng
+        self.first = 0
+        self.toServe = []
+        self.deckAvailableSelf = np.array([
+            [3,3,3,3,3],
+            [2,2,2,2,2],
+            [2,2,2,2,2],
+            [2,2,2,2,2],
+            [1,1,1,1,1]
+        ], dtype="uint")
+        self.deckAvailableOthers = self.deckAvailableSelf.copy()
+        self.teammates = {}
+        self.teammateHands = {}
+        self.states = np.array([   #row = value  column = color
+            [2,2,2,2,2],
+            [1,1,1,1,1],
+            [1,1,1,1,1],
+            [1,1,1,1,1],
+            [3,3,3,3,3]
+        ], dtype="uint")
+        self.table = [0,0,0,0,0]
+        self.population = np.zeros(0, dtype = moveDtype)
+        self.hintMoves = []
+        self.hint = 0
+        self.errors = 0
+        self.memory = []
+        self.hand = Hand()
         for _ in range(cards):
             newCard = Card()
             self.hand.append(newCard)
@@ -296,20 +426,21 @@ class Player(object):
                 for c in key.hand:                          #initialize hands for players
                     newCard = Card()
                     self.deckAvailableSelf[c.value - 1, colors.index(c.color)] -= 1       
-                    newCard.calcProb(deckAvailableOthers)        #initialize card probabilities
-                    hand.append([c.value, c.color, copy.deepcopy(newCard)])
-                self.teammates[name] = copy.deepcopy(hand)
+                    hand.append([c.value, c.color, newCard])
+                self.teammates[name] = hand
+                self.teammateHands[name] = Hand([c[2] for c in hand])
+                self.teammateHands[name].calcProb(self.deckAvailableOthers)        #initialize card probabilities
 
 
 
     #######################################################################################################################
     #
-    # Function to keep track of the states of single cards: allow to detect critical and playable cards
+    # Function to keep track of the states of the cards: allow to detect critical and playable cards
+    # The states of every color are taken from cardStates with the height of the firework and the cards left
     #
     # Args:
     #  
-    #   - i: index of value (card value -1)
-    #   - j: index of the color (using internal reference)
+    #   - none
     #
     # Return: 
     # 
@@ -317,29 +448,8 @@ class Player(object):
     #
     #######################################################################################################################
     
-    def newStates(self, i, j):
-        if(i == 5):                                             #exit condition for recursion
-            return
-        if(deckAvailableOthers[i,j] != 0):                      #if there are still cards in play
-            play = (i == table[j])
-            if i + 1 <= table[j]:
-                crit = False
-            elif i != 0 and i + 1 > table[j] and self.states[table[j]:i + 1,j].min() == 0:
-                crit = False
-                play = False
-            else :
-                crit = deckAvailableOthers[i][j] == 1
-            if(not crit and not play):                          #discardable
-                self.states[i,j] = 1
-            elif(crit and not play):                            #critical not playable
-                self.states[i,j] = 3
-            elif(play and not crit):                            #playable not critical
-                self.states[i,j] = 2
-            else:
-                self.states[i,j] = 4                            #playable and critical
-        else:
-            self.states[i,j] = 0                                #not in game anymore
-        self.newStates(i + 1, j)                                #recursion
+    def updateStates(self):
+        self.states[:] = cardStates[self.table, countWeights @ self.deckAvailableOthers].T
         
 
     
@@ -367,25 +477,17 @@ class Player(object):
    
     def update(self, data):
         
-        global hint
-        global errors
-        global deckAvailableOthers
-        global memory
-
         if(type(data) is GameData.ServerGameStateData):                         
 
-            hint = data.usedNoteTokens                          #update global variables
-            errors = data.usedStormTokens
+            self.hint = data.usedNoteTokens                     #update game counters
+            self.errors = data.usedStormTokens
 
             for player in self.toServe:                         #update players whose hand changed since player's last turn
 
                 card = copy.deepcopy([p for p in data.players if p.name == player][0].hand[-1])         #take last drawn card (only one per turn)
                 self.deckAvailableSelf[card.value - 1, colors.index(card.color)] -= 1                   #remove from cards available to player
-                tuple = [card.value, card.color, copy.deepcopy(self.teammates[player][-1][2])]          #adapt
-                tuple[2].calcProb(deckAvailableOthers)                                                  #calculate probabilities
-                self.teammates[player].pop(-1)                                                          #remove placeholder
-                self.teammates[player].append(copy.deepcopy(tuple))                                     #add real card
-                self.newStates(card.value - 1, colors.index(card.color))                                #update states
+                self.teammates[player][-1] = [card.value, card.color, self.teammates[player][-1][2]]    #add real card
+                self.teammateHands[player].calcProb(self.deckAvailableOthers, [len(self.teammates[player]) - 1]) #calculate probabilities
                 
             self.toServe.clear()
                  
@@ -395,8 +497,9 @@ class Player(object):
                 
                 for i in range(len(self.hand)):
                     
-                    memory.append(0)
-                    self.hand[i].calcProb(self.deckAvailableSelf)                   #calculate probabilities for cards in hand 
+                    self.memory.append(0)
+
+                self.hand.calcProb(self.deckAvailableSelf)                          #calculate probabilities for cards in hand 
 
         elif(type(data) is GameData.ServerActionValid 
             or type(data) is GameData.ServerPlayerThunderStrike
@@ -404,23 +507,23 @@ class Player(object):
 
             if type(data) is GameData.ServerPlayerMoveOk:
                 
-                table[colors.index(data.card.color)]= data.card.value               #update table
+                self.table[colors.index(data.card.color)]= data.card.value               #update table
 
             if(data.lastPlayer == self.name):                                       #if player -> remove played card from cards available
                 
-                if(memory[data.cardHandIndex] != 1):                                #only if did not have perfect information
+                if(self.memory[data.cardHandIndex] != 1):                                #only if did not have perfect information
                     
                     self.deckAvailableSelf[data.card.value - 1, colors.index(data.card.color)] -= 1
                 
-                deckAvailableOthers[data.card.value - 1, colors.index(data.card.color)] -=1         #update played cards
-                memory.pop(data.cardHandIndex)                                      #remove memory of hand
-                memory.append(0)                                                    #init new card memory
-                self.newStates(data.card.value - 1, colors.index(data.card.color))  #update states
+                self.deckAvailableOthers[data.card.value - 1, colors.index(data.card.color)] -=1         #update played cards
+                self.memory.pop(data.cardHandIndex)                                      #remove memory of hand
+                self.memory.append(0)                                                    #init new card memory
+                self.updateStates()                                                 #update states
 
             else:                                                                   #if teammate
                 
                 self.toServe.append(data.lastPlayer)
-                deckAvailableOthers[data.card.value - 1, colors.index(data.card.color)] -=1         #update played cards
+                self.deckAvailableOthers[data.card.value - 1, colors.index(data.card.color)] -=1         #update played cards
                 
                 for i in range(len(self.teammates[data.lastPlayer])):                               #update teammate hand
                     
@@ -428,57 +531,65 @@ class Player(object):
                         and self.teammates[data.lastPlayer][i][1] == data.card.color 
                         and data.cardHandIndex == i):
                         
-                        self.newStates(data.card.value - 1,colors.index(data.card.color))
-                        
-                        if(data.card.value - 1 != 4):
-                            
-                            self.newStates(data.card.value, colors.index(data.card.color))
+                        self.updateStates()
                         
                         self.teammates[data.lastPlayer].pop(i)                                      #remove card from teammate hand
+                        self.teammateHands[data.lastPlayer].pop(i)
                         tuple = [0, "", Card()]                                                     #insert placeholder
-                        tuple[2].calcProb(deckAvailableOthers)                                      #this will save hint data
                         self.teammates[data.lastPlayer].append(tuple)
+                        self.teammateHands[data.lastPlayer].append(tuple[2])
+                        self.teammateHands[data.lastPlayer].calcProb(self.deckAvailableOthers, [len(self.teammates[data.lastPlayer]) - 1])  #this will save hint data
         
         elif(type(data) is GameData.ServerHintData ):
             
             if data.destination == self.name:                                   #if player was target of hint
                 
                 redo = 0
+                start = 0
+                saved = self.hand.save()
                 
-                for i in range(len(self.hand)):
+                while start < len(self.hand):
                     
-                    self.hand[i].calcHint(data, i, self.deckAvailableSelf)      #calculate new information
+                    self.hand.calcHint(data, self.deckAvailableSelf, start)    #calculate new information
+                    found = np.where(self.hand.probs[start:].reshape(-1, 25).max(axis = 1) == 1.0)[0] + start
+                    found = [i for i in found if self.memory[i] != 1]                #if card value found by exclusion
                     
-                    if self.hand[i].probs.max() == 1.0 and memory[i] != 1:      #if fard value found by exclusion
-                        
-                        memory[i] = 1                                           #now the player has perfect information
-                        redo = 1
-                        self.deckAvailableSelf[self.hand[i].value - 1, colors.index(self.hand[i].color)] -= 1
+                    if len(found) == 0:
+                        break
+                    
+                    i = found[0]
+                    self.memory[i] = 1                                               #now the player has perfect information
+                    redo = 1
+                    self.deckAvailableSelf[self.hand[i].value - 1, colors.index(self.hand[i].color)] -= 1
+                    self.hand.restore(saved, i + 1)                             #the next cards are calculated again
+                    start = i + 1                                               #with the new deck
                 
                 if redo:                                                        #card found by exclusion removes probabilities
                     
-                    for i in range(len(self.hand)):
-                        
-                        self.hand[i].calcProb(self.deckAvailableSelf)           #update probabilities for self
+                    self.hand.calcProb(self.deckAvailableSelf)                  #update probabilities for self
                     
                     for player in self.teammates:
                         
-                        for c in self.teammates[player]:
-                            
-                            c[2].calcProb(deckAvailableOthers)                  #update probabilities for others
+                        self.teammateHands[player].calcProb(self.deckAvailableOthers)   #update probabilities for others
             
             else:                                                               #if player was not target
                 
-                for i in range(len(self.hand)):
-                    
-                    self.teammates[data.destination][i][2].calcHint(data, i, deckAvailableOthers)   #update probabilities for teammate
+                self.teammateHands[data.destination].calcHint(data, self.deckAvailableOthers)   #update probabilities for teammate
 
                     
     
     #######################################################################################################################
     #
-    # Function that calculate possible hint moves for critical cards.
-    # A card is considered critical if in state 3 or 4
+    # Function that calculate possible hint moves for the cards of the teammates.
+    # All the cards are classified at once, then the candidates are grouped by (player, hintType, value) in the same
+    # order as they are found:
+    #   - playable cards, in state 2 (the hint must be useful for the teammate)
+    #   - critical cards, in state 3 or 4 (the hint must be useful for the teammate)
+    #   - discardable cards, in state 1, only if there are no other hints. Hinting discardable cards is quite of an
+    #       unrewarding move
+    # A hint is useful if the possible values of the card for the teammate have different states
+    # A value (color) hint is made only if the teammate does not know the value (color) and the sum of the value (color)
+    # probabilities is not 0 or 1, that would mean we have already hinted that value (color)
     #
     # Args:
     #  
@@ -490,267 +601,73 @@ class Player(object):
     #
     #######################################################################################################################
     
-    def criticalHint(self):
-
-        # Hint move structure
-        moveType = {
-                "type":"hint",
-                "hintType":"",
-                "player":"",
-                "value":0,
-                "cards":0,    
-                "critical":[],
-                "playable":[],
-                "cardValue":[],
-                "cardColor": []
-            }
+    def findHints(self):
+
+        cards = [(key, c) for key in self.teammates for c in self.teammates[key]]
+        probs = np.concatenate([self.teammateHands[key].probs for key in self.teammates])
+        rows = np.arange(len(cards))
+        values = np.array([c[0] - 1 for _, c in cards])
+        cols = np.array([colors.index(c[1]) for _, c in cards])
+        states = self.states.astype("int")
+
+        possible = probs > 0
+        isUseful = (np.where(possible, states, 5).min(axis = (1, 2)) 
+                    < np.where(possible, states, -1).max(axis = (1, 2)))            # possible states are not all the same
+        state = states[values, cols]
+        prob = probs[rows, values, cols]
+        hintable = (prob != 0) & (prob != 1)                                        # not the card or certainly the card
+        valueSum = np.sum(probs[rows, values, :], axis = 1)
+        colorSum = np.sum(probs[rows, :, cols], axis = 1)
+        valueHint = (np.array([c[2].value == 0 for _, c in cards]) & (valueSum != 0) & (valueSum != 1))
+        colorHint = (np.array([c[2].color == "" for _, c in cards]) & (colorSum != 0) & (colorSum != 1))
+
+        groups = {}
+
+        def add(k, critical, playable):
+            key, c = cards[k]
+            if valueHint[k]:
+                hintType, value = "value", c[0]
+            else:
+                hintType, value = "color", c[1]
+            move = groups.get((key, hintType, value))
+            if move is None:
+                move = {
+                        "type":"hint",
+                        "hintType":hintType,
+                        "player":key,
+                        "value":value,
+                        "cards":0,    
+                        "critical":[],
+                        "playable":[],
+                        "cardValue":[],
+                        "cardColor": []
+                    }
+                groups[(key, hintType, value)] = move
+            move["cards"] += 1
+            move["critical"].append(critical)
+            move["playable"].append(playable)
+            move["cardValue"].append(c[0])
+            move["cardColor"].append(c[1])
+
+        for k in np.where(isUseful & hintable & (state == 2) & (valueHint | colorHint))[0]:
+            add(k, 0, 1)
         
-        for key in self.teammates.keys():                           # We check every teammate
-            
-            hand = self.teammates[key]
-            
-            for c in hand:                                          # We check every card of the hand
-                # The isUseful calculation is used to check if the teammate already know the state of his card
-                
-                stat = -1                                            
-                isUseful = False                                     
-                
-                for i in range(5):
-                    
-                    for j in range(5):
-                        # It's checked if all possible states for the card are the same
-                        
-                        if c[2].probs[i,j] > 0:
-                            
-                            if stat == -1:
-                            
-                                stat = self.states[i,j]
-                            
-                            else:
-                                # If the possible values of the card have different states, the hint can be useful, so it's calculated 
-                                
-                                if stat != self.states[i,j]:
-                                    
-                                    isUseful = True                 
-                
-                # It's checked if:
-                #   - the hint is useful
-                #   - the state for the card is critical (>2)
-                #   - the probability of the card is different from 0 (not the card) or 1 (certainly the card)
-                if (isUseful and self.states[c[0] - 1,colors.index(c[1])] > 2 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] !=0 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] !=1 ):
-                    
-                    append = 0
+        # The color hint of a critical card is made only if it is playable too
+        for k in np.where(isUseful & hintable & (state > 2) & (valueHint | (colorHint & (state == 4))))[0]:
+            add(k, 1, int(state[k] == 4))
 
-            # We check if the sum of the values probabilities is 0 or 1, that would mean we have already hinted that value
-                    if (c[2].value == 0 
-                        and np.sum(c[2].probs[c[0] - 1]) !=0 
-                        and np.sum(c[2].probs[c[0] - 1]) !=1):
-                        
-                        move = copy.deepcopy(moveType)
-                        move["player"] = key
-                        move["cards"] = 1
-                        move["critical"].append(1)
-                        move["playable"].append(int(self.states[c[0]-1,colors.index(c[1])]==4))
-                        move["cardValue"].append(c[0])
-                        move["cardColor"].append(c[1])
-                        move["hintType"] = "value" 
-                        move["value"] = c[0]
-
-                # If we already calculated a certain hint we don't add it as new hint, but merge it to the existing one
-                        for hint in hintMoves:
-                            
-                            if (hint["player"] == move["player"] 
-                                and hint["hintType"] == move["hintType"] 
-                                and hint["value"] == move["value"]):
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(1)
-                                hint["playable"].append(int(self.states[c[0] - 1,colors.index(c[1])] == 4))
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append = 1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move)        
-
-                   # Same checks as before but for the color 
-                    elif (c[2].color == "" 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 0 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 1 
-                        and self.states[c[0]-1,colors.index(c[1])] == 4):
-                        
-                        append = 0
-                        move2 = copy.deepcopy(moveType)
-                        move2["player"] = key
-                        move2["cards"] = 1
-                        move2["critical"].append(1)
-                        move2["playable"].append(int(self.states[c[0]-1,colors.index(c[1])] == 4))
-                        move2["cardValue"].append(c[0])
-                        move2["cardColor"].append(c[1])
-                        move2["hintType"] = "color"
-                        move2["value"] = c[1]
-                        
-                        for hint in hintMoves:
-                            
-                            if (hint["player"] == move2["player"] 
-                                and hint["hintType"] == move2["hintType"] 
-                                and hint["value"] == move2["value"]):
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(1)
-                                hint["playable"].append(int(self.states[c[0] - 1,colors.index(c[1])] == 4))
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append = 1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move2) 
+        if len(groups) == 0:
 
+            for k in np.where(hintable & (state == 1) & (valueHint | colorHint))[0]:
+                add(k, 0, 0)
 
-        
-    #######################################################################################################################
-    #
-    # Function that calculate possible hint moves for playable cards.
-    # A card is considered playable if in state 2 (the 4 state is already considered in the previous function)
-    # Almost identical to criticalHint but with a few different checks
-    #
-    # Args:
-    #  
-    #   - none
-    #
-    # Return: 
-    # 
-    #   - none
-    #
-    #######################################################################################################################
-    
-    def playableHint(self):
-        
-        # Same as criticalHint moveType
-        moveType = {
-                "type":"hint",
-                "hintType":"",
-                "player":"",
-                "value":0,
-                "cards":0,    
-                "critical":[],
-                "playable":[],
-                "cardValue":[],
-                "cardColor": []
-            }
-
-
-        for key in self.teammates.keys():
-            
-            hand = self.teammates[key]
-            
-            for c in hand:
-                
-                stat = -1
-                isUseful = False
-                
-                for i in range(5):
-                    
-                    for j in range(5):
-                        
-                        if c[2].probs[i,j] > 0:
-                            
-                            if stat == -1:
-                                
-                                stat = self.states[i,j]
-                            
-                            else:
-                                
-                                if stat != self.states[i,j]:
-                                    
-                                    isUseful = True
-                # The flag is changed to be ==2 (playable not critical) instead of >2 (critical or critical and playable)
-                
-                if (isUseful and self.states[c[0] - 1,colors.index(c[1])] == 2 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] != 0 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] != 1):
-                    
-                    append = 0
-                    
-                    if (c[2].value == 0 
-                        and np.sum(c[2].probs[c[0] - 1]) != 0 
-                        and np.sum(c[2].probs[c[0] - 1]) != 1):
-                        
-                        move = copy.deepcopy(moveType)
-                        move["player"] = key
-                        move["cards"] = 1
-                        move["critical"].append(0)
-                        move["playable"].append(1)
-                        move["cardValue"].append(c[0])
-                        move["cardColor"].append(c[1])
-                        move["hintType"] = "value" 
-                        move["value"] = c[0]
-
-                        for hint in hintMoves:
-                            
-                            if (hint["player"] == move["player"] 
-                                and hint["hintType"] == move["hintType"] 
-                                and hint["value"] == move["value"]):
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(0)
-                                hint["playable"].append(1)
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append = 1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move)
- 
-                    elif (c[2].color == "" 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 0 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 1):
-                        
-                        append = 0
-                        move2 = copy.deepcopy(moveType)
-                        move2["player"] = key
-                        move2["cards"] = 1
-                        move2["critical"].append(0)
-                        move2["playable"].append(1)
-                        move2["cardValue"].append(c[0])
-                        move2["cardColor"].append(c[1])
-                        move2["hintType"] = "color"
-                        move2["value"] = c[1]
-
-                        for hint in hintMoves:
-                            
-                            if ((hint["player"] == move2["player"]) 
-                                and (hint["hintType"] == move2["hintType"]) 
-                                and (hint["value"] == move2["value"])): 
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(0)
-                                hint["playable"].append(1)
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append = 1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move2)          
+        self.hintMoves.extend(groups.values())
 
 
 
     #######################################################################################################################
     #
-    # Function that calculate possible hint moves for discardable cards.
-    # A card is considered discardable if in state 1 
-    # Almost identical to criticalHint but with a few different checks
-    # Shouldn't be called very often, because hinting discardable cards is quite of an unrewarding move
+    # Function that calculate the identities (value, color) each card in hand can have, knowing what the player knows
     #
     # Args:
     #  
@@ -758,109 +675,29 @@ class Player(object):
     #
     # Return: 
     # 
-    #   - none
+    #   - identity: array (cards, 5, 5), True for the identities of every card with its known value and color
+    #   - known: array (cards), True for the cards with perfect information
+    #   - chance: array (cards, 5, 5), the chance of every identity (1 for the cards with perfect information)
     #
     #######################################################################################################################
-    
-    def discardableHint(self):
-        
-        # Same as criticalHint moveType
-        moveType = {
-                "type":"hint",
-                "hintType":"",
-                "player":"",
-                "value":0,
-                "cards":0,    
-                "critical":[],
-                "playable":[],
-                "cardValue":[],
-                "cardColor": []
-            }
-
-
-        for key in self.teammates.keys():
-            
-            hand = self.teammates[key]
-            
-            for c in hand:
-                # Similar to criticalHint and playableHint, some different flags
-                
-                if (self.states[c[0]-1,colors.index(c[1])] == 1 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] != 0 
-                    and c[2].probs[c[0] - 1,colors.index(c[1])] != 1):
-                    
-                    append = 0
-                    
-                    if (c[2].value == 0 
-                        and np.sum(c[2].probs[c[0] - 1]) != 0 
-                        and np.sum(c[2].probs[c[0] - 1]) != 1):
-                        
-                        move = copy.deepcopy(moveType)
-                        move["player"] = key
-                        move["cards"] = 1
-                        move["critical"].append(0)
-                        move["playable"].append(0)
-                        move["cardValue"].append(c[0])
-                        move["cardColor"].append(c[1])
-                        move["hintType"] = "value" 
-                        move["value"] = c[0]
-
-                        for hint in hintMoves:
-                            
-                            if (hint["player"] == move["player"] 
-                                and hint["hintType"] == move["hintType"] 
-                                and hint["value"] == move["value"]):
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(0)
-                                hint["playable"].append(0)
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append=1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move)
- 
-                    elif (c[2].color == "" 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 0 
-                        and np.sum(c[2].probs[:, colors.index(c[1])]) != 1):
-                        
-                        append = 0
-                        move2 = copy.deepcopy(moveType)
-                        move2["player"] = key
-                        move2["cards"] = 1
-                        move2["critical"].append(0)
-                        move2["playable"].append(0)
-                        move2["cardValue"].append(c[0])
-                        move2["cardColor"].append(c[1])
-                        move2["hintType"] = "color"
-                        move2["value"] = c[1]
-
-                        for hint in hintMoves:
-                            
-                            if ((hint["player"] == move2["player"]) 
-                                and (hint["hintType"] == move2["hintType"]) 
-                                and (hint["value"] == move2["value"])): 
-                                
-                                hint["cards"] += 1
-                                hint["critical"].append(0)
-                                hint["playable"].append(0)
-                                hint["cardValue"].append(c[0])
-                                hint["cardColor"].append(c[1])
-                                append = 1
-                                break
-                        
-                        if append == 0:
-                            
-                            hintMoves.append(move2)          
+
+    def cardIdentities(self):
+        values = np.array([card.value for card in self.hand]).reshape(-1, 1, 1)
+        cols = np.array([colors.index(card.color) if card.color != "" else -1 for card in self.hand]).reshape(-1, 1, 1)
+        index = np.arange(5)
+        identity = (((values == 0) | (index.reshape(1, 5, 1) == values - 1)) 
+                    & ((cols == -1) | (index.reshape(1, 1, 5) == cols)))
+        known = (values != 0) & (cols != -1)
+        chance = np.where(known, 1.0, self.hand.probs)
+        return identity, known, chance
 
 
 
     #######################################################################################################################
     #
     # Function that calculate possible play/discard moves for the cards in hand
+    # The moves are stored in population as a table of moveDtype (see moves.py), with a play and a discard row for
+    # every card, without the rows that have no identity
     #
     # Args:
     #  
@@ -873,205 +710,25 @@ class Player(object):
     #######################################################################################################################
     
     def findMoves(self):
-        
-        global population
-        
-        population.clear()
-
-        # Temporary Play/Discard move structure, simplified for the inital pruning but different from the final one
-        moveType = {
-                "card":0,
-                "type":"",
-                "critical":0,
-                "chance":0,
-                "value": 0,
-                "color":""
-            }
-        groupMoves = []         # List used for moves grouping
-        effectiveMoves = []     # Another list used as temporary place before extending population 
-        move = moveType.copy()
-
-        for card in self.hand:
-            
-            # If we know for certain the value/color of the card 
-            if card.value != 0 and card.color != "":
-                
-                move = moveType.copy()
-                
-                # We check if the state for the card is playable or playable-critical
-                if (self.states[card.value - 1, colors.index(card.color)] == 2 
-                    or self.states[card.value - 1, colors.index(card.color)] == 4):
-                    
-                    # The play moves are constucted
-                    move["card"] = self.hand.index(card)
-                    move["type"] = "play"
-                    move["chance"] = 1
-                    move["critical"] = int(self.states[card.value - 1, colors.index(card.color)] == 4)
-                    move["value"] = card.value
-                    move["color"] = card.color
-                    population.append(move)
-                
-                # We check if the state for the card is discardable
-                elif self.states[card.value - 1, colors.index(card.color)] == 1:
-                    
-                    # The hint moves are constructed 
-                    move["card"] = self.hand.index(card)
-                    move["type"] = "discard"
-                    move["chance"] = 1
-                    move["value"] = card.value
-                    move["color"] = card.color
-                    population.append(move)
-            
-            # If we know only the value of the card 
-            elif card.value != 0 and card.color == "":
-                
-                cardTmp = copy.deepcopy(card)
-                
-                #We check for every color if the card could be played or discarded
-                for color in colors:
-                    
-                    move = moveType.copy()
-                    cardTmp.color = color
-                    
-                    #Same checks as before to construct play and discard moves
-                    if ((self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 2 
-                        or self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 4) 
-                        and cardTmp.probs[cardTmp.value - 1,colors.index(cardTmp.color)] != 0):
-
-                        move["card"] = self.hand.index(card)
-                        move["type"] = "play"
-                        move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                        move["critical"] = int(self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 4)
-                        move["value"] = cardTmp.value
-                        move["color"] = cardTmp.color
-                        population.append(move)
-                    
-                    elif (self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 1 
-                        and cardTmp.probs[cardTmp.value - 1,colors.index(cardTmp.color)] != 0):
-                        
-                        move["card"] = self.hand.index(card)
-                        move["type"] = "discard"
-                        move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                        move["value"] = cardTmp.value
-                        move["color"] = cardTmp.color
-                        population.append(move)
-            
-            # If we know only the color of the card, all below follow the same pattern as before
-            elif (card.value == 0 
-                and card.color != ""):
-                
-                cardTmp = card.copy()
-                
-                for i in range(5):
-                    
-                    move = moveType.copy()
-                    cardTmp.value = i+1
-                    
-                    if ((self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 2 
-                        or self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 4) 
-                        and cardTmp.probs[i,colors.index(cardTmp.color)] != 0):
-                        
-                        move["card"] = self.hand.index(card)
-                        move["type"] = "play"
-                        move["chance"] = card.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                        move["critical"] = int(self.states[cardTmp.value - 1, colors.index(cardTmp.color)] == 4)
-                        move["value"] = cardTmp.value
-                        move["color"] = cardTmp.color
-                        population.append(move)
-                    
-                    elif (self.states[card.value - 1, colors.index(cardTmp.color)] == 1 
-                        and cardTmp.probs[i,colors.index(cardTmp.color)] != 0):
-                        
-                        move["card"] = self.hand.index(card)
-                        move["type"] = "discard"
-                        move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                        move["value"] = cardTmp.value
-                        move["color"] = cardTmp.color
-                        population.append(move)
-            
-            # We know only sparse data about the card, so we must check for every option
-            elif (card.value == 0 
-                and card.color == ""):
-                
-                m = card.mask(card.probs, self.states)
-                cardTmp = card.copy()
-                
-                for i in range(5):
-                    for j in range(5):
-                        
-                        move = moveType.copy()
-                        cardTmp.value = i + 1
-                        cardTmp.color = colors[j]
-                        
-                        if ((m[cardTmp.value - 1, colors.index(cardTmp.color)] == 2 
-                            or m[cardTmp.value - 1, colors.index(cardTmp.color)] == 4) 
-                            and cardTmp.probs[i,j] != 0):
-                            
-                            move["card"] = self.hand.index(card)
-                            move["type"] = "play"
-                            move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                            move["critical"] = int(m[cardTmp.value-1, colors.index(cardTmp.color)] == 4)
-                            move["value"] = cardTmp.value
-                            move["color"] = cardTmp.color
-                            population.append(move)
-                        
-                        elif (m[cardTmp.value - 1, colors.index(cardTmp.color)] == 1 
-                            and cardTmp.probs[i,j] != 0):
-                            
-                            move["card"] = self.hand.index(card)
-                            move["type"] = "discard"
-                            move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                            move["value"] = cardTmp.value
-                            move["color"] = cardTmp.color
-                            population.append(move)
-        
-        # Now that I have all moves I group them, if on the same card and same type
-        for i in range(len(self.hand)):
-            
-            groupMoves = list(filter(lambda m : m["card"] == i and m["type"] == "play", population))
-            meeehPlay = {
-                "card": i,          # card: index of the card in the hand
-                "type":"play",      # type: type of moves
-                "critical":[],      # critical: list that append the criticality of a possible card
-                "chance":[],        # chance: list that append the chances of a possible card
-                "valcol":[]         # valcol: list that append the tuples (value, color) of a possible card
-            }
-            meeehDiscard = {
-                "card": i,
-                "type":"discard",
-                "critical":[],
-                "chance":[],
-                "valcol": []
-            }
-
-            for mel in groupMoves:
-                
-                meeehPlay["critical"].append(mel["critical"])
-                meeehPlay["chance"].append(mel["chance"])
-                meeehPlay["valcol"].append((mel["value"], mel["color"]))
-            
-            if len(groupMoves) != 0:
-                
-                effectiveMoves.append(copy.deepcopy(meeehPlay))
-            
-            groupMoves.clear()
-            groupMoves = list(filter(lambda m : m["card"] == i and m["type"] == "discard", population))
-
-            for mel in groupMoves:
 
-                meeehDiscard["critical"].append(mel["critical"])
-                meeehDiscard["chance"].append(mel["chance"])
-                meeehDiscard["valcol"].append((mel["value"], mel["color"]))
-
-            if len(groupMoves) != 0:
-                
-                effectiveMoves.append(copy.deepcopy(meeehDiscard))
-            
-            groupMoves.clear()
-            
-        population.clear()
-        population.extend(copy.deepcopy(effectiveMoves))
-        effectiveMoves.clear()
+        identity, known, chance = self.cardIdentities()
+        possible = identity & (known | (self.hand.probs != 0))     # cards with perfect information do not check probs
+        play = possible & ((self.states == 2) | (self.states == 4))
+        # If only the color is known, the discard is checked on the state of the 5 of that color
+        colorOnly = np.array([card.value == 0 and card.color != "" for card in self.hand]).reshape(-1, 1, 1)
+        discardStates = np.where(colorOnly, self.states[4], self.states)
+        discard = possible & ~play & (discardStates == 1)
+
+        table = np.zeros((len(self.hand), 2), dtype = moveDtype)
+        table["card"] = np.arange(len(self.hand)).reshape(-1, 1)
+        table["type"] = ["play", "discard"]
+        table["move"][:, 0] = play
+        table["move"][:, 1] = discard
+        table["chance"] = np.where(table["move"], chance.reshape(-1, 1, 5, 5), 0)
+        table["state"] = self.states
+        table["critical"][:, 0] = play & (self.states == 4)
+        table = table.reshape(-1)
+        self.population = table[table["move"].any(axis = (1, 2))]
 
     
     
@@ -1081,6 +738,7 @@ class Player(object):
     # A card is considered critical if its state is 3 or 4, with 4 being assigned to critical and playable cards
     # Since the player may not find a safe enough move from the data available, he must pick the best discard
     # among the cards in hand
+    # A discard row for every card is added to population, with all the identities of the card considered critical
     #
     # Args:
     #  
@@ -1093,108 +751,16 @@ class Player(object):
     #######################################################################################################################
     
     def discardIfAllCritical(self):
-        
-        global population
-        
-        pop = []                                #temporary population of moves
-        moveType = {                            #move structure
-                "card":0,
-                "type":"discard",
-                "critical":1,
-                "chance":0,
-                "value": 0,
-                "color":""
-            }
-        groupMoves = []
-        effectiveMoves = []
-        move = moveType.copy()
-
-        for card in self.hand:
-
-            if (card.value != 0 
-                and card.color != ""):                  #card has perfect information
-                
-                move = moveType.copy()
-                move["card"] = self.hand.index(card)
-                move["chance"] = 1
-                move["value"] = card.value
-                move["color"] = card.color
-                pop.append(copy.deepcopy(move))
-                
-            elif (card.value != 0                       #player knows value but not color
-                and card.color == ""):
-                
-                cardTmp = copy.deepcopy(card)
-                
-                for color in colors:
-                    
-                    move = moveType.copy()
-                    cardTmp.color = color
-                    move["card"] = self.hand.index(card)
-                    move["chance"]=cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                    move["value"] = cardTmp.value
-                    move["color"] = cardTmp.color
-                    pop.append(copy.deepcopy(move))
-            
-            elif (card.value == 0                       #player knows color but not value
-                and card.color != ""):
-                
-                cardTmp = copy.deepcopy(card)
-                
-                for i in range(5):
-                    
-                    move = moveType.copy()
-                    cardTmp.value = i + 1
-                    move["card"] = self.hand.index(card)
-                    move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                    move["value"] = cardTmp.value
-                    move["color"] = cardTmp.color
-                    pop.append(copy.deepcopy(move))
-            
-            elif (card.value == 0                       #player has only sparse information on card
-                and card.color == ""):
-                
-                cardTmp = copy.deepcopy(card)
-                
-                for i in range(5):
-                    
-                    for j in range(5):
-                        
-                        move = moveType.copy()
-                        cardTmp.value = i + 1
-                        cardTmp.color = colors[j]
-                        move["card"] = self.hand.index(card)
-                        move["chance"] = cardTmp.probs[cardTmp.value - 1, colors.index(cardTmp.color)]
-                        move["value"] = cardTmp.value
-                        move["color"] = cardTmp.color
-                        pop.append(copy.deepcopy(move))
-        
-        for i in range(len(self.hand)):
-            
-            groupMoves = list(filter(lambda m : m["card"] == i, pop))
-            meeehDiscard = {
-                "card": i,
-                "type":"discard",
-                "critical":[],
-                "chance":[],
-                "valcol": []
-            }
-
-            for mel in groupMoves:
-                
-                meeehDiscard["critical"].append(1)
-                meeehDiscard["chance"].append(mel["chance"])
-                meeehDiscard["valcol"].append((mel["value"], mel["color"]))
-            
-            if len(groupMoves) != 0:
-                
-                effectiveMoves.append(copy.deepcopy(meeehDiscard))
-            
-            groupMoves.clear()
-        
-        population.extend(copy.deepcopy(effectiveMoves))
-        pop.clear()
-        effectiveMoves.clear()
+
+        identity, known, chance = self.cardIdentities()
+        table = np.zeros(len(self.hand), dtype = moveDtype)
+        table["card"] = np.arange(len(self.hand))
+        table["type"] = "discard"
+        table["move"] = identity
+        table["chance"] = np.where(identity, chance, 0)
+        table["state"] = self.states
+        table["critical"] = identity
+        self.population = np.concatenate((self.population, table))
 
 
 
@@ -1214,29 +780,24 @@ class Player(object):
     
     def play(self):
 
-        hintMoves.clear()
+        self.hintMoves.clear()
         
         self.findMoves()    # Select the play discard moves
         
-        if hint < 8:          # Select the playable and critical hints only if enough hint tokens are available
-
-            self.playableHint()
-            self.criticalHint()
+        if self.hint < 8:          # Select the hints only if enough hint tokens are available
 
-        if len(hintMoves) == 0 and hint < 8: # Select the discardable hints only if enough hint tokens are available and
-                                             #    there are no other available hints
-            self.discardableHint()
+            self.findHints()
 
-        if len(hintMoves) == 0:              #If no hints are available, we can be obliged to discard a critical card
+        if len(self.hintMoves) == 0:              #If no hints are available, we can be obliged to discard a critical card
                                              #   so we select those moves too
             self.discardIfAllCritical()
 
-        move = selectMoves(population, hintMoves, hint, errors, self.hand, self.states)     # Effective decision of the move
+        move = selectMoves(self.population, self.hintMoves, self.hint, self.errors, self.hand, self.rng)     # Effective decision of the move
 
         if move[0]["type"] != "hint":     # If we played/discarded we update our hand with an empty card
             
             self.hand.pop(move[0]["card"])
             self.hand.append(Card())
-            self.hand[-1].calcProb(self.deckAvailableSelf)
+            self.hand.calcProb(self.deckAvailableSelf, [len(self.hand) - 1])
         
         return move
\ No newline at end of file
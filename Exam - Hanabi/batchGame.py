@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# Batch engine: many games with the rules of game.Game played in lockstep, with the state in NumPy arrays.
+# Every step takes one action code (see game.legalActions) for each game, a finished game is dealt again at once.
+# Run with: python batchGame.py [numGames] [numPlayers] [steps]
+#   plays random legal actions and prints the games per second
+# or with: python batchGame.py check [numPlayers] [steps]
+#   plays the same actions on game.Game and checks that the two engines agree
+
+import logging
+import random
+import sys
+import time
+
+import numpy as np
+
+import GameData
+from constants import COLORS
+from game import ACTION_DISCARD, ACTION_HINT, ACTION_PLAY, CARDS, HINTS_PER_PLAYER, MAX_HAND_SIZE, NUM_ACTIONS, Game
+
+MAX_NOTE_TOKENS = 8
+MAX_STORM_TOKENS = 3
+DECK_SIZE = len(CARDS)
+NO_CARD = DECK_SIZE     # code of an empty position of a hand
+
+# color index, value and hint slots (as in game.Player.counts) of each card code, the last row is NO_CARD
+_cardColor = np.array([COLORS.index(card.color) for card in CARDS] + [0], dtype=np.int64)
+_cardValue = np.array([card.value for card in CARDS] + [0], dtype=np.int64)
+_cardSlots = np.zeros((DECK_SIZE + 1, HINTS_PER_PLAYER), dtype=bool)
+_cardSlots[np.arange(DECK_SIZE), _cardColor[:DECK_SIZE]] = True
+_cardSlots[np.arange(DECK_SIZE), len(COLORS) + _cardValue[:DECK_SIZE] - 1] = True
+
+
+
+#######################################################################################################################
+#
+# Class BatchGame: numGames games with the same number of players
+# Only legal actions change a game, as with the make functions of game.Game
+# The games are dealt with consecutive seeds, game.Game(seed) deals the same cards
+#
+# Attributes (arrays with a row for each game):
+#   - seeds: seed of the deal
+#   - deck: codes of the cards in the order they are drawn
+#   - nextCard: position in deck of the next card to draw
+#   - hands: (numGames, numPlayers, handSize) codes of the cards in the hands, NO_CARD after the last card
+#   - handSizes: (numGames, numPlayers) number of cards in each hand
+#   - heights: (numGames, 5) value of the top card of each firework, by color index
+#   - discardCounts: (numGames, 5, 5) discarded cards by value - 1 and color index
+#   - noteTokens, stormTokens: used tokens
+#   - currentPlayer: seat of the player to move
+#   - lastTurn, lastMoves: the deck is over, and the actions left
+#   - games, totalScore: number of games finished and sum of their scores
+#
+#######################################################################################################################
+
+class BatchGame(object):
+
+    # seed: seed of the first deal, None for a random one
+    def __init__(self, numGames: int, numPlayers: int, seed=None) -> None:
+        super().__init__()
+        if numPlayers < 2 or numPlayers > 5:
+            raise ValueError("The number of players must be between 2 and 5")
+        self.numGames = numGames
+        self.numPlayers = numPlayers
+        self.handSize = MAX_HAND_SIZE if numPlayers < 4 else MAX_HAND_SIZE - 1
+        self.nextSeed = seed if seed is not None else random.getrandbits(32)
+        self.rows = np.arange(numGames)
+        self.seeds = np.zeros(numGames, dtype=np.int64)
+        self.deck = np.zeros((numGames, DECK_SIZE), dtype=np.int64)
+        self.nextCard = np.zeros(numGames, dtype=np.int64)
+        self.hands = np.full((numGames, numPlayers, self.handSize), NO_CARD, dtype=np.int64)
+        self.handSizes = np.zeros((numGames, numPlayers), dtype=np.int64)
+        self.heights = np.zeros((numGames, len(COLORS)), dtype=np.int64)
+        self.discardCounts = np.zeros((numGames, 5, len(COLORS)), dtype=np.int64)
+        self.noteTokens = np.zeros(numGames, dtype=np.int64)
+        self.stormTokens = np.zeros(numGames, dtype=np.int64)
+        self.currentPlayer = np.zeros(numGames, dtype=np.int64)
+        self.lastTurn = np.zeros(numGames, dtype=bool)
+        self.lastMoves = np.zeros(numGames, dtype=np.int64)
+        self.games = 0
+        self.totalScore = 0
+        self.reset(np.ones(numGames, dtype=bool))
+
+    # Deals the games of the mask again, with the next seeds
+    def reset(self, mask):
+        rows = np.flatnonzero(mask)
+        for row in rows:
+            # the same shuffle as game.Game.start, the deck order lists the last card drawn first
+            order = list(range(DECK_SIZE))
+            random.Random(self.nextSeed).shuffle(order)
+            self.deck[row] = order[::-1]
+            self.seeds[row] = self.nextSeed
+            self.nextSeed += 1
+        dealt = self.numPlayers * self.handSize
+        if self.numPlayers < 4:
+            # five cards to a player, then to the next one
+            self.hands[rows] = self.deck[rows, :dealt].reshape(-1, self.numPlayers, self.handSize)
+        else:
+            # a card to each player, four times
+            self.hands[rows] = self.deck[rows, :dealt].reshape(-1, self.handSize, self.numPlayers).transpose(0, 2, 1)
+        self.nextCard[rows] = dealt
+        self.handSizes[rows] = self.handSize
+        self.heights[rows] = 0
+        self.discardCounts[rows] = 0
+        self.noteTokens[rows] = 0
+        self.stormTokens[rows] = 0
+        self.currentPlayer[rows] = 0
+        self.lastTurn[rows] = False
+        self.lastMoves[rows] = self.numPlayers + 1
+
+    # Returns a (numGames, NUM_ACTIONS) mask of the legal actions of the current player of each game
+    def legalActions(self):
+        mask = np.zeros((self.numGames, NUM_ACTIONS), dtype=bool)
+        inHand = np.arange(self.handSize) < self.handSizes[self.rows, self.currentPlayer][:, None]
+        mask[:, ACTION_PLAY:ACTION_PLAY + self.handSize] = inHand
+        mask[:, ACTION_DISCARD:ACTION_DISCARD + self.handSize] = inHand & (self.noteTokens > 0)[:, None]
+        # the hints each hand can get
+        slots = _cardSlots[self.hands].any(axis=2) & (self.noteTokens < MAX_NOTE_TOKENS)[:, None, None]
+        for offset in range(1, self.numPlayers):
+            base = ACTION_HINT + (offset - 1) * HINTS_PER_PLAYER
+            mask[:, base:base + HINTS_PER_PLAYER] = slots[self.rows, (self.currentPlayer + offset) % self.numPlayers]
+        return mask
+
+    # Makes an action in every game, the games ended by it are dealt again
+    # Returns three arrays: the legal actions (the others change nothing), the games ended and their scores
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        rows, current = self.rows, self.currentPlayer
+        valid = self.legalActions()[rows, np.clip(actions, 0, NUM_ACTIONS - 1)] & (actions >= 0) & (actions < NUM_ACTIONS)
+        isPlay = valid & (actions < ACTION_DISCARD)
+        isDiscard = valid & (actions >= ACTION_DISCARD) & (actions < ACTION_HINT)
+        isHint = valid & (actions >= ACTION_HINT)
+        position = np.clip(np.where(isPlay, actions - ACTION_PLAY, actions - ACTION_DISCARD), 0, self.handSize - 1)
+        card = self.hands[rows, current, position]
+        color, value = _cardColor[card], _cardValue[card]
+
+        # fireworks and tokens
+        played = isPlay & (value == self.heights[rows, color] + 1)
+        self.heights[rows[played], color[played]] += 1
+        self.noteTokens -= played & (value == 5) & (self.noteTokens > 0)
+        struck = isPlay & ~played
+        self.stormTokens += struck
+        discarded = isDiscard | struck
+        self.discardCounts[rows[discarded], value[discarded] - 1, color[discarded]] += 1
+        self.noteTokens -= isDiscard
+        self.noteTokens += isHint
+
+        # the card leaves the hand, the others move left and the card drawn goes last
+        moved = rows[isPlay | isDiscard]
+        if len(moved) > 0:
+            seat = current[moved]
+            indexes = np.arange(self.handSize)[None, :]
+            indexes = np.minimum(indexes + (indexes >= position[moved][:, None]), self.handSize - 1)
+            hand = np.take_along_axis(self.hands[moved, seat], indexes, axis=1)
+            drawn = self.nextCard[moved] < DECK_SIZE
+            last = self.handSizes[moved, seat] - 1
+            hand[np.arange(len(moved)), last] = np.where(drawn, self.deck[moved, np.minimum(self.nextCard[moved], DECK_SIZE - 1)], NO_CARD)
+            self.hands[moved, seat] = hand
+            self.handSizes[moved, seat] -= ~drawn
+            self.nextCard[moved] += drawn
+
+        # next turn and end of the game, as in game.Game.satisfyRequest
+        self.currentPlayer = np.where(valid, (current + 1) % self.numPlayers, current)
+        ending = valid & (self.nextCard == DECK_SIZE)
+        self.lastTurn |= ending
+        self.lastMoves -= ending
+        struckOut = self.stormTokens == MAX_STORM_TOKENS
+        done = valid & (struckOut | (self.lastTurn & (self.lastMoves == 0)))
+        scores = np.where(done & ~struckOut, self.heights.sum(axis=1), 0)
+        self.games += int(done.sum())
+        self.totalScore += int(scores.sum())
+        self.reset(done)
+        return valid, done, scores
+
+
+
+#######################################################################################################################
+#
+# Function that picks a random legal action for every game
+#
+# Args:
+#
+#   - mask: the legal actions, as returned by BatchGame.legalActions
+#   - rng: NumPy random generator
+#
+# Return:
+#
+#   - actions: array of action codes
+#
+#######################################################################################################################
+
+def randomActions(mask, rng):
+    return np.argmax(rng.random(mask.shape) * mask, axis=1)
+
+
+
+#######################################################################################################################
+#
+# Function that plays the same random actions on a BatchGame and on a game.Game for each of its games, and checks
+# after every step that the two engines have the same legal actions, hands, fireworks, tokens and final scores
+#
+# Args:
+#
+#   - numGames: number of games played at once
+#   - numPlayers: number of players of the games
+#   - steps: number of steps
+#   - seed: seed of the first deal and of the actions
+#
+# Return:
+#
+#   - games: number of games finished during the check
+#
+#######################################################################################################################
+
+def crossCheck(numGames=32, numPlayers=2, steps=500, seed=0):
+    batch = BatchGame(numGames, numPlayers, seed)
+    names = ["player" + str(i) for i in range(numPlayers)]
+
+    def newGame(gameSeed):
+        game = Game(int(gameSeed))
+        for name in names:
+            game.addPlayer(name)
+        game.start()
+        return game
+
+    def check(condition, row, what):
+        if not condition:
+            raise RuntimeError("Game of seed " + str(batch.seeds[row]) + ": different " + what)
+
+    games = [newGame(gameSeed) for gameSeed in batch.seeds]
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        mask = batch.legalActions()
+        for row, game in enumerate(games):
+            check(list(np.flatnonzero(mask[row])) == list(game.legalActions()), row, "legal actions")
+            for seat, player in enumerate(game.getPlayers()):
+                check(list(batch.hands[row, seat, :batch.handSizes[row, seat]]) == player.hand, row, "hands")
+            state = game.satisfyRequest(GameData.ClientGetGameStateRequest(names[0]), names[0])[0]
+            check([len(state.tableCards[color]) for color in COLORS] == list(batch.heights[row]), row, "fireworks")
+            check(state.usedNoteTokens == batch.noteTokens[row] and state.usedStormTokens == batch.stormTokens[row], row, "tokens")
+            check(list(map(list, game.getDiscardCounts())) == batch.discardCounts[row].tolist(), row, "discard pile")
+        # some illegal actions too, they must change nothing
+        actions = np.where(rng.random(numGames) < 0.05, rng.integers(0, NUM_ACTIONS, numGames), randomActions(mask, rng))
+        rowSeeds = batch.seeds.copy()
+        valid, done, scores = batch.step(actions)
+        for row, game in enumerate(games):
+            check(game.makeAction(int(actions[row])) == valid[row], row, "legality of action " + str(actions[row]))
+            check(game.isGameOver() == done[row], row, "end of the game")
+            if done[row]:
+                check(game.getScore() == scores[row], row, "score")
+                check(batch.seeds[row] != rowSeeds[row], row, "deal")
+                games[row] = newGame(batch.seeds[row])
+    return batch.games
+
+
+
+#######################################################################################################################
+#
+# Function that plays random games on a BatchGame for a number of steps
+#
+# Args:
+#
+#   - numGames: number of games played at once
+#   - numPlayers: number of players of the games
+#   - steps: number of steps
+#   - seed: seed of the first deal and of the actions, None for random games
+#
+# Return:
+#
+#   - batch: the BatchGame, with the number of games and the total score
+#   - elapsed: seconds of the run
+#
+#######################################################################################################################
+
+def runRandom(numGames=1024, numPlayers=2, steps=1000, seed=None):
+    batch = BatchGame(numGames, numPlayers, seed)
+    rng = np.random.default_rng(seed)
+    startTime = time.perf_counter()
+    for _ in range(steps):
+        batch.step(randomActions(batch.legalActions(), rng))
+    return batch, time.perf_counter() - startTime
+
+
+if __name__ == '__main__':
+    logging.disable(logging.WARNING)
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        numPlayers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        steps = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+        print("%d games checked" % crossCheck(32, numPlayers, steps))
+    else:
+        numGames = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+        numPlayers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+        steps = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+        batch, elapsed = runRandom(numGames, numPlayers, steps)
+        print("%d games, average score %.2f, %.0f steps/s, %.0f games/s (%.1f million games/hour)" % (batch.games,
+              batch.totalScore / max(1, batch.games), numGames * steps / elapsed, batch.games / elapsed,
+              batch.games / elapsed * 3600 / 1e6))
\ No newline at end of file
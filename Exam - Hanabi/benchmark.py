@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Micro benchmarks, run with: python benchmark.py [codec|search|environment]
+
+import copy
+import logging
+import pickle
+import random
+import sys
+import timeit
+
+import GameData
+import codec
+from constants import COLORS
+from environment import HanabiEnv
+from game import CARDS, Game
+
+
+#######################################################################################################################
+#
+# Function that builds a sample of the messages exchanged during a game, taken from a game played at random
+#
+# Args:
+#
+#   - numPlayers: number of players of the table
+#   - turns: number of random actions performed before taking the sample
+#
+# Return:
+#
+#   - messages: list of GameData objects
+#
+#######################################################################################################################
+
+def sampleMessages(numPlayers=5, turns=30):
+    random.seed(0)
+    game = Game(1) # the same deck at every run, so that runs can be compared
+    names = ["player" + str(i) for i in range(numPlayers)]
+    messages = {}
+    for data in (GameData.ClientPlayerAddData(names[0]), GameData.ServerPlayerConnectionOk(names[0]),
+                 GameData.ClientPlayerStartRequest(names[0]), GameData.ServerPlayerStartRequestAccepted(numPlayers, 1),
+                 GameData.ServerStartGameData(names), GameData.ClientPlayerReadyData(names[0])):
+        messages[type(data)] = data
+    for name in names:
+        game.addPlayer(name)
+    game.start()
+    for turn in range(turns):
+        name = names[turn % numPlayers]
+        # mostly hints and discards, so that the game is still running at the end
+        request = random.choice([
+            GameData.ClientPlayerPlayCardRequest(name, 0),
+            GameData.ClientPlayerDiscardCardRequest(name, 0),
+            GameData.ClientPlayerDiscardCardRequest(name, 1),
+            GameData.ClientHintData(name, names[(turn + 1) % numPlayers], "value", random.randint(1, 5)),
+            GameData.ClientHintData(name, names[(turn + 1) % numPlayers], "color", random.choice(COLORS)),
+        ])
+        messages[type(request)] = request
+        singleData, multipleData = game.satisfyRequest(request, name)
+        for data in (singleData, multipleData):
+            if data is not None:
+                messages[type(data)] = data
+    request = GameData.ClientGetGameStateRequest(names[0])
+    messages[type(request)] = request
+    messages[GameData.ServerGameStateData] = game.satisfyRequest(request, names[0])[0]
+    return list(messages.values())
+
+
+#######################################################################################################################
+#
+# Function that compares the codec with pickle, the encoding used before, on every sample message, and the dedicated
+# codecs with the generic codec of their schema
+#
+# Args:
+#
+#   - number: number of encodings/decodings timed for each message
+#   - repeat: number of times they are timed, the best time is kept
+#
+# Return:
+#
+#   - none
+#
+#######################################################################################################################
+
+def benchmarkCodec(number=1000, repeat=20):
+    # the functions compared are timed in turn and the best time is kept, to leave out the noise of other processes
+    def rates(*functions):
+        best = [min(timeit.repeat(f, number=number, repeat=1)) for f in functions]
+        for _ in range(repeat - 1):
+            best = [min(t, timeit.timeit(f, number=number)) for t, f in zip(best, functions)]
+        return [number / t for t in best]
+    print("%-34s %8s %8s %12s %12s %12s %12s" % ("message", "pickle B", "codec B",
+          "pickle enc/s", "codec enc/s", "pickle dec/s", "codec dec/s"))
+    for data in sampleMessages():
+        pickled = pickle.dumps(data)
+        encoded = codec.encode(data)
+        print("%-34s %8d %8d %12.0f %12.0f %12.0f %12.0f" % (type(data).__name__, len(pickled), len(encoded),
+              *rates(lambda: pickle.dumps(data), lambda: codec.encode(data),
+                     lambda: pickle.loads(pickled), lambda: codec.decode(encoded))))
+    # the messages sent at every turn have a dedicated codec: compare it with the generic codec of their schema
+    print()
+    print("%-34s %12s %12s %12s %12s" % ("dedicated codec", "schema enc/s", "codec enc/s", "schema dec/s",
+          "codec dec/s"))
+    for data in sampleMessages():
+        if type(data) not in codec._dedicatedCodecs:
+            continue
+        encodeMessage, decodeMessage = codec._schemaCodecs[type(data)]
+        encoded = codec.encode(data)
+        def schemaEncode():
+            out = bytearray()
+            encodeMessage(out, data)
+            return bytes(out)
+        schemaEncoded = schemaEncode()
+        print("%-34s %12.0f %12.0f %12.0f %12.0f" % (type(data).__name__,
+              *rates(schemaEncode, lambda: codec.encode(data),
+                     lambda: decodeMessage(schemaEncoded, 1), lambda: codec.decode(encoded))))
+
+
+
+#######################################################################################################################
+#
+# Function that compares copy.deepcopy with Game.clone, and times the legal actions and the make/unmake functions
+# a search plays ahead with
+#
+# Args:
+#
+#   - number: number of copies and of actions timed
+#
+# Return:
+#
+#   - none
+#
+#######################################################################################################################
+
+def benchmarkSearch(number=20000):
+    names = ["player" + str(i) for i in range(5)]
+    game = Game(0)
+    for name in names:
+        game.addPlayer(name)
+    game.start()
+    def hintNext():
+        destination = names[(names.index(game.getCurrentPlayerName()) + 1) % len(names)]
+        return game.makeHint(destination, "value", CARDS[game.getPlayers()[names.index(destination)].hand[0]].value)
+    # a few hints and a discard, so that the current player can do every kind of action
+    for _ in range(3):
+        hintNext()
+    game.makeDiscard(0)
+    print("%-20s %12s" % ("operation", "per second"))
+    for label, function in (("deepcopy", lambda: copy.deepcopy(game)), ("clone", game.clone),
+                            ("legal actions", game.legalActions)):
+        print("%-20s %12.0f" % (label, number / timeit.timeit(function, number=number)))
+    for label, make in (("play + unmake", lambda: game.makePlay(0)),
+                        ("discard + unmake", lambda: game.makeDiscard(0)),
+                        ("hint + unmake", hintNext)):
+        def makeUnmake():
+            if make():
+                game.unmake()
+        print("%-20s %12.0f" % (label, number / timeit.timeit(makeUnmake, number=number)))
+
+
+
+#######################################################################################################################
+#
+# Function that compares the environment, which updates the observations of the seats at every step, with asking
+# the game the state of every seat after each action
+#
+# Args:
+#
+#   - games: number of games played for each number of players
+#
+# Return:
+#
+#   - none
+#
+#######################################################################################################################
+
+def benchmarkEnvironment(games=50):
+    print("%-8s %16s %16s" % ("players", "env steps/s", "show steps/s"))
+    for numPlayers in range(2, 6):
+        env = HanabiEnv(numPlayers, 0)
+        rng = random.Random(0)
+        steps = 0
+        startTime = timeit.default_timer()
+        for _ in range(games):
+            observations, done = env.reset(), False
+            while not done:
+                observations, _, done = env.step(rng.choice(observations[env.currentPlayer].legalActions))
+                steps += 1
+        envRate = steps / (timeit.default_timer() - startTime)
+        rng = random.Random(0)
+        steps = 0
+        startTime = timeit.default_timer()
+        for seed in range(games):
+            game = Game(seed)
+            for name in env.names:
+                game.addPlayer(name)
+            game.start()
+            while not game.isGameOver():
+                game.makeAction(rng.choice(game.legalActions()))
+                for name in env.names:
+                    game.satisfyRequest(GameData.ClientGetGameStateRequest(name), name)
+                steps += 1
+        print("%-8d %16.0f %16.0f" % (numPlayers, envRate, steps / (timeit.default_timer() - startTime)))
+
+
+if __name__ == '__main__':
+    logging.disable(logging.WARNING) # invalid random actions are expected
+    if len(sys.argv) < 2 or sys.argv[1] == "codec":
+        benchmarkCodec()
+    if len(sys.argv) < 2 or sys.argv[1] == "search":
+        benchmarkSearch()
+    if len(sys.argv) < 2 or sys.argv[1] == "environment":
+        benchmarkEnvironment()
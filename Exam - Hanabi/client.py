@@ -15,6 +15,8 @@ else:
     ip = argv[1]
     port = int(argv[2])
     playerName = argv[3] #self
+    numPlayers = int(argv[4]) if len(argv) > 4 else None   #table size asked to the lobby, None for the server default
+    room = argv[5] if len(argv) > 5 else None               #room to join, None to let the lobby choose
 
 run = True
 
@@ -26,6 +28,10 @@ status = statuses[0]
 
 hintState = ("", "")
 
+pushState = True    #the server sends us the game state after every action, no need to ask for it with show
+states = {}     #last game states received, by version: the server sends only the changes since the one we ask with
+lastVersion = None
+
 def manageInput():
     global run
     global status
@@ -39,14 +45,14 @@ def manageInput():
             run = False
             os._exit(0)
         elif command == "ready" and status == statuses[0]:
-            s.send(GameData.ClientPlayerStartRequest(playerName).serialize())
+            s.sendall(GameData.ClientPlayerStartRequest(playerName).serialize())
         elif command == "show" and status == statuses[1]:
-            s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+            s.sendall(GameData.ClientGetGameStateRequest(playerName).serialize())
         elif command.split(" ")[0] == "discard" and status == statuses[1]:
             try:
                 cardStr = command.split(" ")
                 cardOrder = int(cardStr[1])
-                s.send(GameData.ClientPlayerDiscardCardRequest(playerName, cardOrder).serialize())
+                s.sendall(GameData.ClientPlayerDiscardCardRequest(playerName, cardOrder).serialize())
             except:
                 print("Maybe you wanted to type 'discard <num>'?")
                 continue
@@ -54,7 +60,7 @@ def manageInput():
             try:
                 cardStr = command.split(" ")
                 cardOrder = int(cardStr[1])
-                s.send(GameData.ClientPlayerPlayCardRequest(playerName, cardOrder).serialize())
+                s.sendall(GameData.ClientPlayerPlayCardRequest(playerName, cardOrder).serialize())
             except:
                 print("Maybe you wanted to type 'play <num>'?")
                 continue
@@ -75,7 +81,7 @@ def manageInput():
                     if value not in ["green", "red", "blue", "yellow", "white"]:
                         print("Error: card color can only be green, red, blue, yellow or white")
                         continue
-                s.send(GameData.ClientHintData(playerName, destination, t, value).serialize())
+                s.sendall(GameData.ClientHintData(playerName, destination, t, value).serialize())
             except:
                 print("Maybe you wanted to type 'hint <type> <destinatary> <value>'?")
                 continue
@@ -88,28 +94,42 @@ def manageInput():
 
 #funzions to send moves to server
 def sendHint(destination, type, value):
-    s.send(GameData.ClientHintData(playerName, destination, type, value).serialize())
+    s.sendall(GameData.ClientHintData(playerName, destination, type, value).serialize())
 
 def play(card):
-    s.send(GameData.ClientPlayerPlayCardRequest(playerName, card).serialize())
+    s.sendall(GameData.ClientPlayerPlayCardRequest(playerName, card).serialize())
 
 def discard(card):
-    s.send(GameData.ClientPlayerDiscardCardRequest(playerName, card).serialize())
+    s.sendall(GameData.ClientPlayerDiscardCardRequest(playerName, card).serialize())
+
+def show():
+    s.sendall(GameData.ClientGetGameStateRequest(playerName, lastVersion).serialize())
+
+#rebuild the full game state from the changes sent by the server
+def fullState(data):
+    global lastVersion
+    if type(data) is GameData.ServerGameStateDelta:
+        data = data.apply(states[data.baseVersion])
+    states[data.version] = data
+    lastVersion = data.version
+    while len(states) > 8:
+        del states[next(iter(states))]
+    return data
 
 
 with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-    request = GameData.ClientPlayerAddData(playerName)
+    request = GameData.ClientPlayerAddData(playerName, pushState, room, numPlayers)
     s.connect((HOST, PORT))
-    s.send(request.serialize())
-    data = s.recv(DATASIZE)
-    data = GameData.GameData.deserialize(data)
+    s.sendall(request.serialize())
+    reader = GameData.FrameReader(s)
+    data = reader.recv()
     if type(data) is GameData.ServerPlayerConnectionOk:
-        print("Connection accepted by the server. Welcome " + playerName)
+        print("Connection accepted by the server. Welcome " + playerName + " to " + data.room)
     print("[" + playerName + " - " + status + "]: ", end="")
     Thread(target=manageInput).start()
     
 
-    s.send(GameData.ClientPlayerStartRequest(playerName).serialize()) #auto-ready
+    s.sendall(GameData.ClientPlayerStartRequest(playerName).serialize()) #auto-ready
 
     first = 1
     bufferHint = []
@@ -117,18 +137,18 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
     while run:
         dataOk = False
 
-        data = s.recv(DATASIZE)
-        data = GameData.GameData.deserialize(data)
+        data = reader.recv()
         
-        if not data:
-            continue
+        if data is None:
+            print("Connection closed by the server")
+            run = False
+            break
 
         if type(data) is GameData.ServerPlayerStartRequestAccepted:
             dataOk = True
             print("Ready: " + str(data.acceptedStartRequests) + "/"  + str(data.connectedPlayers) + " players")
 
-            data = s.recv(DATASIZE)
-            data = GameData.GameData.deserialize(data)
+            data = reader.recv()
 
         if type(data) is GameData.ServerStartGameData:
             dataOk = True
@@ -139,14 +159,17 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             #init player
             me = agent.Player(cards, argv[3])
 
-            s.send(GameData.ClientPlayerReadyData(playerName).serialize())
+            s.sendall(GameData.ClientPlayerReadyData(playerName).serialize())
             status = statuses[1]
             
             
-            s.send(GameData.ClientGetGameStateRequest(playerName).serialize()) #show for start game
+            show() #show for start game
             first = 1
 
         
+        if type(data) is GameData.ServerGameStateDelta or type(data) is GameData.ServerGameStateData:
+            data = fullState(data)
+
         if type(data) is GameData.ServerGameStateData:
             #sync mechanism for first show
             if first == 1:
@@ -155,9 +178,9 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 #manage hint out of sync
                 for h in bufferHint:
                     dataOk = True
-                    me.update(data)
-                    if data.player == playerName:
-                        s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+                    me.update(h)
+                    if h.player == playerName and not pushState:
+                        show()
                 bufferHint.clear()
             
             dataOk = True
@@ -178,15 +201,15 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         if type(data) is GameData.ServerActionInvalid and first==0:
             dataOk = True
             #something happened check if everything is ok + useful updates
-            s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+            show()
         
         if type(data) is GameData.ServerActionValid and first==0:
             dataOk = True
             #someone discarded -> check and update
             me.update(data)
 
-            if data.player == playerName:
-                s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+            if data.player == playerName and not pushState:
+                show()
                 
          
         if type(data) is GameData.ServerPlayerMoveOk and first==0:
@@ -195,8 +218,8 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             #someone made a move -> check and update
             me.update(data)
         
-            if data.player == playerName:
-                s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+            if data.player == playerName and not pushState:
+                show()
                 
 
 
@@ -207,8 +230,8 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             #someone made a mistake -> check and update
             me.update(data)
             
-            if data.player == playerName:
-                s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+            if data.player == playerName and not pushState:
+                show()
                 
 
         if type(data) is GameData.ServerHintData:
@@ -220,8 +243,8 @@ with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
                 #someone sent a hint -> check and update
                 me.update(data)
                 
-                if data.player == playerName:
-                    s.send(GameData.ClientGetGameStateRequest(playerName).serialize())
+                if data.player == playerName and not pushState:
+                    show()
             
         if type(data) is GameData.ServerInvalidDataReceived:
             dataOk = True
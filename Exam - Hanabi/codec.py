@@ -0,0 +1,483 @@
+# Binary codec for the objects in GameData.py
+# Each message is encoded as a type tag followed by the fields listed in its schema,
+# or by a dedicated codec for the messages sent at every turn.
+# Classes are looked up by tag and not by import path, and debug strings that
+# are constant for a class (e.g. action) are not sent at all.
+import numbers
+import operator
+import struct
+
+import GameData
+from constants import COLORS
+from game import Card, Player
+
+_u8 = struct.Struct("<B")
+_i16 = struct.Struct("<h")
+_u16 = struct.Struct("<H")
+_i32 = struct.Struct("<i")
+_u32 = struct.Struct("<I")
+
+_SERVER_SENDER = "Game Server"
+_NO_SLOT = 255
+_NONE_U8 = 255
+_NONE_STR = 0xFFFF # in place of the length
+_NAME_BY_NAME = 255 # in place of the number of names
+_colorIndex = {color: i for i, color in enumerate(COLORS)}
+
+
+# Field encoders: append the value to out
+def _encodeU8(out: bytearray, value):
+    out += _u8.pack(value)
+
+def _encodeI16(out: bytearray, value):
+    out += _i16.pack(value)
+
+def _encodeVersion(out: bytearray, value):
+    # versions start from 1, 0 is no version
+    out += _u32.pack(0 if value is None else value)
+
+def _encodeStr(out: bytearray, value):
+    data = str(value).encode("utf-8")
+    out += _u16.pack(len(data))
+    out += data
+
+def _encodeOptStr(out: bytearray, value):
+    if value is None:
+        out += _u16.pack(_NONE_STR)
+    else:
+        _encodeStr(out, value)
+
+def _encodeOptU8(out: bytearray, value):
+    out.append(_NONE_U8 if value is None else value)
+
+def _encodeBool(out: bytearray, value):
+    out.append(1 if value else 0)
+
+def _encodeValue(out: bytearray, value):
+    # hint values: a card value, a color or anything else the client typed
+    # any integral value (numpy integers, bools) is sent as an int,
+    # the isinstance on the abstract class is slow so it is skipped for ints and strings
+    if type(value) is not int and type(value) is not str and isinstance(value, numbers.Integral):
+        value = int(value)
+    if type(value) is int:
+        if 0 <= value <= 255:
+            out.append(0)
+            out.append(value)
+        else:
+            out.append(2)
+            out += _i32.pack(value)
+    elif value in _colorIndex:
+        out.append(1)
+        out.append(_colorIndex[value])
+    else:
+        out.append(3)
+        _encodeStr(out, value)
+
+def _encodeCard(out: bytearray, card: Card):
+    # card id, then value and color packed in a single byte
+    out.append(card.id)
+    out.append(card.value << 4 | _colorIndex[card.color])
+
+def _encodeCards(out: bytearray, cards):
+    out.append(len(cards))
+    for card in cards:
+        _encodeCard(out, card)
+
+def _encodeIndices(out: bytearray, indices):
+    out.append(len(indices))
+    out += bytes(indices)
+
+def _encodeNames(out: bytearray, names):
+    # a single string with the names separated by NUL characters, that is decoded with one split;
+    # if a name has a NUL in it the count is _NAME_BY_NAME followed by the count and the names one at a time
+    joined = "\0".join(names)
+    if names and joined.count("\0") == len(names) - 1:
+        out.append(len(names))
+        _encodeStr(out, joined)
+    else:
+        out.append(_NAME_BY_NAME)
+        out.append(len(names))
+        for name in names:
+            _encodeStr(out, name)
+
+def _encodePlayers(out: bytearray, players):
+    out.append(len(players))
+    for p in players:
+        _encodeStr(out, p.name)
+        _encodeCards(out, p.hand)
+
+def _encodeTable(out: bytearray, table: dict):
+    out.append(len(table))
+    for color in table:
+        out.append(_colorIndex[color])
+        _encodeCards(out, table[color])
+
+def _encodeData(out: bytearray, value):
+    # the invalid data can be a message or a plain string
+    if isinstance(value, GameData.GameData):
+        out.append(1)
+        _encodeMessage(out, value)
+    else:
+        out.append(0)
+        _encodeStr(out, value)
+
+
+# Field decoders: return the value and the position after it
+def _decodeU8(data: bytes, pos: int):
+    return data[pos], pos + 1
+
+def _decodeI16(data: bytes, pos: int):
+    return _i16.unpack_from(data, pos)[0], pos + 2
+
+def _decodeVersion(data: bytes, pos: int):
+    value = _u32.unpack_from(data, pos)[0]
+    return (None if value == 0 else value), pos + 4
+
+def _decodeStr(data: bytes, pos: int):
+    size = _u16.unpack_from(data, pos)[0]
+    pos += 2
+    return data[pos:pos + size].decode("utf-8"), pos + size
+
+def _decodeOptStr(data: bytes, pos: int):
+    if _u16.unpack_from(data, pos)[0] == _NONE_STR:
+        return None, pos + 2
+    return _decodeStr(data, pos)
+
+def _decodeOptU8(data: bytes, pos: int):
+    return (None if data[pos] == _NONE_U8 else data[pos]), pos + 1
+
+def _decodeBool(data: bytes, pos: int):
+    return data[pos] == 1, pos + 1
+
+def _decodeValue(data: bytes, pos: int):
+    kind = data[pos]
+    if kind == 0:
+        return data[pos + 1], pos + 2
+    if kind == 1:
+        return COLORS[data[pos + 1]], pos + 2
+    if kind == 2:
+        return _i32.unpack_from(data, pos + 1)[0], pos + 5
+    return _decodeStr(data, pos + 1)
+
+# decoded cards never change, so every card is built only once
+_decodedCards = {}
+
+def _decodeCard(data: bytes, pos: int):
+    key = data[pos:pos + 2]
+    card = _decodedCards.get(key)
+    if card is None:
+        card = Card(key[0], key[1] >> 4, COLORS[key[1] & 0x0F])
+        _decodedCards[key] = card
+    return card, pos + 2
+
+def _decodeCards(data: bytes, pos: int):
+    count = data[pos]
+    pos += 1
+    cards = []
+    for _ in range(count):
+        card, pos = _decodeCard(data, pos)
+        cards.append(card)
+    return cards, pos
+
+def _decodeIndices(data: bytes, pos: int):
+    count = data[pos]
+    return list(data[pos + 1:pos + 1 + count]), pos + 1 + count
+
+def _decodeNames(data: bytes, pos: int):
+    if data[pos] != _NAME_BY_NAME:
+        joined, pos = _decodeStr(data, pos + 1)
+        return joined.split("\0"), pos
+    count = data[pos + 1]
+    pos += 2
+    names = []
+    for _ in range(count):
+        name, pos = _decodeStr(data, pos)
+        names.append(name)
+    return names, pos
+
+def _decodePlayers(data: bytes, pos: int):
+    count = data[pos]
+    pos += 1
+    players = []
+    for _ in range(count):
+        name, pos = _decodeStr(data, pos)
+        p = Player(name)
+        p.hand, pos = _decodeCards(data, pos)
+        players.append(p)
+    return players, pos
+
+def _decodeTable(data: bytes, pos: int):
+    count = data[pos]
+    pos += 1
+    table = {}
+    for _ in range(count):
+        color = COLORS[data[pos]]
+        table[color], pos = _decodeCards(data, pos + 1)
+    return table, pos
+
+def _decodeData(data: bytes, pos: int):
+    if data[pos] == 1:
+        return _decodeMessage(data, pos + 1)
+    return _decodeStr(data, pos + 1)
+
+
+_kinds = {
+    "u8": (_encodeU8, _decodeU8),
+    "i16": (_encodeI16, _decodeI16),
+    "version": (_encodeVersion, _decodeVersion),
+    "str": (_encodeStr, _decodeStr),
+    "optstr": (_encodeOptStr, _decodeOptStr),
+    "optu8": (_encodeOptU8, _decodeOptU8),
+    "bool": (_encodeBool, _decodeBool),
+    "value": (_encodeValue, _decodeValue),
+    "card": (_encodeCard, _decodeCard),
+    "cards": (_encodeCards, _decodeCards),
+    "indices": (_encodeIndices, _decodeIndices),
+    "names": (_encodeNames, _decodeNames),
+    "players": (_encodePlayers, _decodePlayers),
+    "table": (_encodeTable, _decodeTable),
+    "data": (_encodeData, _decodeData),
+}
+
+# Message schemas, the tag of a class is its position in the list.
+# Only append new classes at the end, or old tags change.
+# Each entry: (class, constant attributes, fields as (attribute, kind))
+# The kind "slot" is the index of a name in the players field, that must come before it.
+_schemas = [
+    (GameData.ClientHintData, {"action": "Hint data from client to server"},
+        (("sender", "str"), ("destination", "str"), ("type", "str"), ("value", "value"))),
+    (GameData.ClientPlayerAddData, {"action": "Connection request"},
+        (("sender", "str"), ("pushState", "bool"), ("room", "optstr"), ("numPlayers", "optu8"))),
+    (GameData.ClientPlayerStartRequest, {"action": "Player start request"},
+        (("sender", "str"),)),
+    (GameData.ClientPlayerReadyData, {"action": "Player start status received"},
+        (("sender", "str"),)),
+    (GameData.ClientGetGameStateRequest, {"action": "Show cards request"},
+        (("sender", "str"), ("version", "version"))),
+    (GameData.ClientPlayerDiscardCardRequest, {"action": "Discard card request"},
+        (("sender", "str"), ("handCardOrdered", "i16"))),
+    (GameData.ClientPlayerPlayCardRequest, {"action": "Play card request"},
+        (("sender", "str"), ("handCardOrdered", "i16"))),
+    (GameData.ServerHintData, {"action": "Hint data from server to destination client"},
+        (("source", "str"), ("destination", "str"), ("type", "str"), ("value", "value"),
+         ("positions", "indices"), ("player", "str"))),
+    (GameData.ServerPlayerConnectionOk, {"action": "Connection ok"},
+        (("message", "str"), ("room", "optstr"))),
+    (GameData.ServerPlayerStartRequestAccepted, {"action": "Player start request accepted"},
+        (("connectedPlayers", "u8"), ("acceptedStartRequests", "u8"))),
+    (GameData.ServerStartGameData, {"action": "Game start"},
+        (("players", "names"),)),
+    (GameData.ServerGameStateData, {"action": "Show cards response"},
+        (("players", "players"), ("currentPlayer", "slot"), ("handSize", "u8"),
+         ("usedNoteTokens", "u8"), ("usedStormTokens", "u8"), ("tableCards", "table"),
+         ("discardPile", "cards"), ("version", "version"))),
+    (GameData.ServerActionValid, {},
+        (("action", "str"), ("player", "str"), ("lastPlayer", "str"), ("card", "card"),
+         ("cardHandIndex", "i16"), ("handLength", "u8"))),
+    (GameData.ServerPlayerMoveOk, {"action": "Correct move! Well done!"},
+        (("player", "str"), ("lastPlayer", "str"), ("card", "card"),
+         ("cardHandIndex", "i16"), ("handLength", "u8"))),
+    (GameData.ServerPlayerThunderStrike, {"action": "The Gods are angry at you!"},
+        (("player", "str"), ("lastPlayer", "str"), ("card", "card"),
+         ("cardHandIndex", "i16"), ("handLength", "u8"))),
+    (GameData.ServerActionInvalid, {"action": "Invalid action"},
+        (("message", "str"),)),
+    (GameData.ServerInvalidDataReceived, {"action": "Invalid data received"},
+        (("data", "data"),)),
+    (GameData.ServerGameOver, {"action": "Game over", "message": "Game over"},
+        (("score", "u8"), ("scoreMessage", "str"))),
+    (GameData.ServerGameStateDelta, {"action": "Show cards changes response"},
+        (("baseVersion", "version"), ("version", "version"), ("players", "players"),
+         ("currentPlayer", "str"), ("handSize", "u8"), ("usedNoteTokens", "u8"),
+         ("usedStormTokens", "u8"), ("tableCards", "table"), ("discardPile", "cards"))),
+    (GameData.ClientSpectatorAddData, {"action": "Spectator request"},
+        (("sender", "str"), ("room", "str"))),
+    (GameData.ServerSpectatorConnectionOk, {"action": "Spectator ok"},
+        (("room", "str"), ("players", "names"))),
+]
+
+# Message codecs: a codec is a pair (encode(out, data), decode(data, pos)), built from the tag, the class, the
+# constant attributes and the fields of a schema.
+def _schemaCodec(tag, cls, constants, fields):
+    # generic codec, that dispatches every field on its kind
+    encoders = tuple((name, kind, _kinds.get(kind, (None, None))[0]) for name, kind in fields)
+    decoders = tuple((name, kind, _kinds.get(kind, (None, None))[1]) for name, kind in fields)
+
+    def encodeMessage(out: bytearray, data):
+        out.append(tag)
+        for name, kind, encoder in encoders:
+            value = getattr(data, name)
+            if kind == "slot":
+                names = [p.name for p in data.players]
+                if value in names:
+                    out.append(names.index(value))
+                else:
+                    out.append(_NO_SLOT)
+                    _encodeStr(out, value)
+            else:
+                encoder(out, value)
+
+    def decodeMessage(data: bytes, pos: int):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(constants)
+        for name, kind, decoder in decoders:
+            if kind == "slot":
+                slot = data[pos]
+                pos += 1
+                if slot == _NO_SLOT:
+                    value, pos = _decodeStr(data, pos)
+                else:
+                    value = obj.players[slot].name
+            else:
+                value, pos = decoder(data, pos)
+            setattr(obj, name, value)
+        return obj, pos
+
+    return encodeMessage, decodeMessage
+
+
+# Dedicated codecs of the messages sent at every turn (hints, moves) and of the game start,
+# that skip the dispatch on the kinds of the generic codec.
+def _packStr(value) -> bytes:
+    data = str(value).encode("utf-8")
+    return _u16.pack(len(data)) + data
+
+def _hintCodec(tag, cls, constants, fields):
+    # ClientHintData and ServerHintData: the strings are sent together as the names of _encodeNames,
+    # then the value and, from the server, the positions
+    strings = tuple(name for name, kind in fields if kind == "str")
+    getStrings = operator.attrgetter(*strings)
+    fromServer = "positions" in (name for name, _ in fields)
+
+    def encodeMessage(out: bytearray, data):
+        joined = "\0".join(map(str, getStrings(data)))
+        if joined.count("\0") == len(strings) - 1:
+            raw = joined.encode("utf-8")
+            out += _namesHead.pack(tag, len(strings), len(raw))
+            out += raw
+        else:
+            out.append(tag)
+            _encodeNames(out, [str(value) for value in getStrings(data)])
+        _encodeValue(out, data.value)
+        if fromServer:
+            positions = data.positions
+            out.append(len(positions))
+            out += bytes(positions)
+
+    def decodeMessage(data: bytes, pos: int):
+        obj = cls.__new__(cls)
+        values = obj.__dict__
+        values.update(constants)
+        if data[pos] != _NAME_BY_NAME:
+            end = pos + 3 + (data[pos + 1] | data[pos + 2] << 8)
+            values.update(zip(strings, data[pos + 3:end].decode("utf-8").split("\0")))
+            pos = end
+        else:
+            names, pos = _decodeNames(data, pos)
+            values.update(zip(strings, names))
+        values["value"], pos = _decodeValue(data, pos)
+        if fromServer:
+            count = data[pos]
+            values["positions"] = list(data[pos + 1:pos + 1 + count])
+            pos += 1 + count
+        return obj, pos
+
+    return encodeMessage, decodeMessage
+
+# tag, number of names and length of the joined names
+_namesHead = struct.Struct("<BBH")
+
+def _moveCodec(tag, cls, constants, fields):
+    # ServerActionValid (that also sends the action), ServerPlayerMoveOk and ServerPlayerThunderStrike
+    withAction = fields[0][0] == "action"
+
+    def encodeMessage(out: bytearray, data):
+        out.append(tag)
+        if withAction:
+            out += _packStr(data.action)
+        out += _packStr(data.player)
+        out += _packStr(data.lastPlayer)
+        card = data.card
+        out += _moveTail.pack(card.id, card.value << 4 | _colorIndex[card.color], data.cardHandIndex, data.handLength)
+
+    def decodeMessage(data: bytes, pos: int):
+        obj = cls.__new__(cls)
+        values = obj.__dict__
+        values.update(constants)
+        if withAction:
+            values["action"], pos = _decodeStr(data, pos)
+        values["player"], pos = _decodeStr(data, pos)
+        values["lastPlayer"], pos = _decodeStr(data, pos)
+        values["card"], _ = _decodeCard(data, pos)
+        values["cardHandIndex"], values["handLength"] = _moveTail.unpack_from(data, pos)[2:]
+        return obj, pos + _moveTail.size
+
+    return encodeMessage, decodeMessage
+
+# card id, value and color, hand index, hand length
+_moveTail = struct.Struct("<BBhB")
+
+def _startCodec(tag, cls, constants, fields):
+    # ServerStartGameData: the names of the players
+    def encodeMessage(out: bytearray, data):
+        out.append(tag)
+        _encodeNames(out, data.players)
+
+    def decodeMessage(data: bytes, pos: int):
+        obj = cls.__new__(cls)
+        obj.__dict__.update(constants)
+        obj.players, pos = _decodeNames(data, pos)
+        return obj, pos
+
+    return encodeMessage, decodeMessage
+
+_dedicatedCodecs = {
+    GameData.ClientHintData: _hintCodec,
+    GameData.ServerHintData: _hintCodec,
+    GameData.ServerActionValid: _moveCodec,
+    GameData.ServerPlayerMoveOk: _moveCodec,
+    GameData.ServerPlayerThunderStrike: _moveCodec,
+    GameData.ServerStartGameData: _startCodec,
+}
+
+_encoders = {}
+_decoders = []
+# the generic codecs of every class, kept to compare them with the dedicated ones (see benchmark.py)
+_schemaCodecs = {}
+for _tag, (_cls, _constants, _fields) in enumerate(_schemas):
+    _constants = dict(_constants)
+    if issubclass(_cls, GameData.ServerToClientData):
+        _constants["sender"] = _SERVER_SENDER
+    _schemaCodecs[_cls] = _schemaCodec(_tag, _cls, _constants, _fields)
+    _encoders[_cls], _decoder = _dedicatedCodecs.get(_cls, _schemaCodec)(_tag, _cls, _constants, _fields)
+    _decoders.append(_decoder)
+
+
+def _encodeMessage(out: bytearray, data: GameData.GameData):
+    encoder = _encoders.get(type(data))
+    if encoder is None:
+        raise ValueError("No schema for " + type(data).__name__)
+    encoder(out, data)
+
+
+def _decodeMessage(data: bytes, pos: int):
+    return _decoders[data[pos]](data, pos + 1)
+
+
+def encode(data: GameData.GameData) -> bytes:
+    '''
+    Encodes a GameData object, without the frame header.
+    '''
+    encoder = _encoders.get(type(data))
+    if encoder is None:
+        raise ValueError("No schema for " + type(data).__name__)
+    out = bytearray()
+    encoder(out, data)
+    return bytes(out)
+
+
+def decode(data: bytes) -> GameData.GameData:
+    '''
+    Decodes a GameData object encoded by encode.
+    '''
+    return _decoders[data[0]](data, 1)[0]
@@ -1,4 +1,6 @@
 # Program constants / server constants
 HOST = "127.0.0.1"
 PORT =  1024 # 0x4A7AB1 could have been a better port, but networkers did not allow us to have it
-DATASIZE = int(10240 / 4)
\ No newline at end of file
+DATASIZE = int(10240 / 4) # recv buffer size
+HEADERSIZE = 4 # bytes of the length prefix of each frame
+COLORS = ["red", "yellow", "green", "blue", "white"] # same order as the game deck
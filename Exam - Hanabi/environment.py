@@ -0,0 +1,148 @@
+# Multi-agent environment: reset/step around game.Game, with what every seat can see of the game
+# The observations are built once at reset and then updated with the changes of each action, so a step costs the
+# same whatever the number of players
+
+from array import array
+
+from constants import COLORS
+from game import ACTION_DISCARD, ACTION_HINT, CARDS, Game
+
+
+
+#######################################################################################################################
+#
+# Class Observation: the game as seen by a seat
+# Public parts (fireworks, discard pile, hints, hand sizes) are shared by the observations of all the seats, and all
+# of them are updated in place by HanabiEnv.step: copy what has to be kept between steps
+#
+# Attributes:
+#   - seat: the seat that sees the game
+#   - currentPlayer: seat of the player to move
+#   - noteTokens, stormTokens: used tokens
+#   - deckSize: cards left in the deck
+#   - fireworks: value of the top card of each firework, by color index in COLORS
+#   - discardPile: codes (ids in game.CARDS) of the discarded cards, in order
+#   - hands: codes of the cards of each seat, None for the own hand
+#   - handSizes: number of cards of each seat
+#   - hints: every hint given, as (source seat, destination seat, "color" or "value", value, positions)
+#   - legalActions: codes of the legal actions (see game.legalActions), empty if it is not the turn of the seat
+#
+#######################################################################################################################
+
+class Observation(object):
+    __slots__ = ("seat", "currentPlayer", "noteTokens", "stormTokens", "deckSize", "fireworks", "discardPile",
+                 "hands", "handSizes", "hints", "legalActions")
+
+    def __init__(self, seat: int) -> None:
+        super().__init__()
+        self.seat = seat
+
+
+_noActions = array("B")
+
+
+
+#######################################################################################################################
+#
+# Class HanabiEnv: a game where the seats act in turn through action codes
+#
+# Attributes:
+#   - numPlayers: number of seats
+#   - names: names of the players in the game, by seat
+#   - game: the game.Game being played
+#   - observations: the Observation of each seat
+#   - currentPlayer: seat of the player to move
+#
+#######################################################################################################################
+
+class HanabiEnv(object):
+
+    # seed: seed of the first game, the next resets use the following seeds (None for random games)
+    def __init__(self, numPlayers: int, seed=None) -> None:
+        super().__init__()
+        if numPlayers < 2 or numPlayers > 5:
+            raise ValueError("The number of players must be between 2 and 5")
+        self.numPlayers = numPlayers
+        self.names = ["player" + str(seat) for seat in range(numPlayers)]
+        self.nextSeed = seed
+        self.game = None
+        self.observations = []
+        self.currentPlayer = 0
+
+    # Deals a new game, returns the observations
+    def reset(self, seed=None):
+        if seed is None and self.nextSeed is not None:
+            seed = self.nextSeed
+            self.nextSeed += 1
+        self.game = Game(seed)
+        for name in self.names:
+            self.game.addPlayer(name)
+        self.game.start()
+        self.currentPlayer = 0
+        players = self.game.getPlayers()
+        fireworks = list(self.game.getFireworks())
+        discardPile = []
+        handSizes = [len(p.hand) for p in players]
+        hints = []
+        self.observations = []
+        for seat in range(self.numPlayers):
+            observation = Observation(seat)
+            observation.hands = [None if other == seat else tuple(p.hand) for other, p in enumerate(players)]
+            observation.fireworks = fireworks
+            observation.discardPile = discardPile
+            observation.handSizes = handSizes
+            observation.hints = hints
+            self.observations.append(observation)
+        self.__updateCounters()
+        return self.observations
+
+    # Makes an action of the current player
+    # Returns the observations, the reward (the change of the score) and whether the game is over
+    def step(self, action: int):
+        if self.game is None or self.game.isGameOver():
+            raise ValueError("The game is over, reset it")
+        seat = self.currentPlayer
+        player = self.game.getPlayers()[seat]
+        before = sum(self.game.getFireworks())
+        hand = tuple(player.hand)
+        hint = self.game.actionRequest(action) if action >= ACTION_HINT else None
+        if not self.game.makeAction(action):
+            raise ValueError("Action " + str(action) + " is not legal for seat " + str(seat))
+        first = self.observations[0]
+        if hint is None:
+            position = action - ACTION_DISCARD if action >= ACTION_DISCARD else action
+            code = hand[position]
+            color = COLORS.index(CARDS[code].color)
+            if first.fireworks[color] < self.game.getFireworks()[color]:
+                first.fireworks[color] += 1
+            else:
+                first.discardPile.append(code)
+            # only the hand of the player has changed
+            newHand = tuple(player.hand)
+            first.handSizes[seat] = len(newHand)
+            for other in self.observations:
+                if other.seat != seat:
+                    other.hands[seat] = newHand
+        else:
+            destination = self.names.index(hint.destination)
+            destHand = self.game.getPlayers()[destination].hand
+            if hint.type == "color":
+                positions = [i for i, code in enumerate(destHand) if CARDS[code].color == hint.value]
+            else:
+                positions = [i for i, code in enumerate(destHand) if CARDS[code].value == hint.value]
+            first.hints.append((seat, destination, hint.type, hint.value, positions))
+        self.currentPlayer = (seat + 1) % self.numPlayers
+        self.__updateCounters()
+        done = self.game.isGameOver()
+        reward = (self.game.getScore() if done else sum(self.game.getFireworks())) - before
+        return self.observations, reward, done
+
+    def __updateCounters(self):
+        game = self.game
+        legalActions = game.legalActions()
+        for observation in self.observations:
+            observation.currentPlayer = self.currentPlayer
+            observation.noteTokens = game.getNoteTokens()
+            observation.stormTokens = game.getStormTokens()
+            observation.deckSize = game.getDeckSize()
+            observation.legalActions = legalActions if observation.seat == self.currentPlayer else _noActions
\ No newline at end of file
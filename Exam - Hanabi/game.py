@@ -1,10 +1,15 @@
-from copy import deepcopy
-from random import shuffle
+from array import array
+from collections import OrderedDict
+from itertools import count
+import random
 import GameData
 import logging
+from constants import COLORS
 
 
 class Card(object):
+    __slots__ = ("id", "value", "color")
+
     def __init__(self, id, value, color) -> None:
         super().__init__()
         self.id = id
@@ -26,6 +31,33 @@ class Card(object):
         return self.id == other.id
 
 
+# The 50 cards of the deck, the same for every game: the id of a card is its index (its code in the game state)
+def _buildCards():
+    cards = []
+    for value, copies in ((1, 3), (2, 2), (3, 2), (4, 2), (5, 1)):
+        for _ in range(copies):
+            for color in COLORS:
+                cards.append(Card(len(cards), value, color))
+    return tuple(cards)
+
+CARDS = _buildCards()
+_colorIndex = {color: i for i, color in enumerate(COLORS)}
+# positions in Player.counts of the color and of the value of each card
+_countSlots = tuple((_colorIndex[card.color], len(COLORS) + card.value - 1) for card in CARDS)
+
+# Actions coded as integers, for the current player (see Game.legalActions):
+#   - ACTION_PLAY + i: play the card in position i
+#   - ACTION_DISCARD + i: discard the card in position i
+#   - ACTION_HINT + (offset - 1) * HINTS_PER_PLAYER + h: hint to the player offset seats after the current one, with
+#     h the index of a color in COLORS, or len(COLORS) + value - 1 for a value
+MAX_HAND_SIZE = 5
+HINTS_PER_PLAYER = 2 * len(COLORS)
+ACTION_PLAY = 0
+ACTION_DISCARD = ACTION_PLAY + MAX_HAND_SIZE
+ACTION_HINT = ACTION_DISCARD + MAX_HAND_SIZE
+NUM_ACTIONS = ACTION_HINT + 4 * HINTS_PER_PLAYER
+
+
 class Token(object):
     def __init__(self, type) -> None:
         super().__init__()
@@ -37,11 +69,16 @@ class Token(object):
 
 
 class Player(object):
+    __slots__ = ("name", "ready", "hand", "counts")
+
+    # hand: in the game the codes of the cards (ids in CARDS), in the GameData objects the Card objects
+    # counts: number of cards of the hand of each color and value (see _countSlots), kept by the game
     def __init__(self, name) -> None:
         super().__init__()
         self.name = name
         self.ready = False
         self.hand = []
+        self.counts = [0] * HINTS_PER_PLAYER
 
     def takeCard(self, cards):
         self.hand.append(cards.pop())
@@ -63,8 +100,6 @@ class Player(object):
 
 class Game(object):
 
-    __dataActions = {}
-
     __scoreMessages = [
         "Booooooooooooring!",
         "Meh!",
@@ -73,81 +108,26 @@ class Game(object):
         "AMAZING!",
         "YOU'RE THE BEST!"
     ]
-    __cards = []  # cards are the same for everyone
     __MAX_NOTE_TOKENS = 8
     __MAX_STORM_TOKENS = 3
     __MAX_FIREWORKS = 5
+    __MAX_STATE_HISTORY = 32  # versions a client can ask a delta from
+    __versions = count(1)  # shared by all games, so a version never belongs to two games
 
-    def __init__(self) -> None:
+    # seed: seed of the deck shuffle, the same seed deals the same cards (None for a random deal)
+    def __init__(self, seed=None) -> None:
         super().__init__()
-        self.__discardPile = []
+        self.__rng = random.Random(seed)
         # Init cards
+        # the state keeps the codes of the cards, the Card objects of CARDS are used only in the responses
         self.__gameOver = False
-        if len(self.__cards) == 0:
-            numCards = 0
-            for _ in range(3):
-                self.__cards.append(Card(numCards, 1, "red"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 1, "yellow"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 1, "green"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 1, "blue"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 1, "white"))
-                numCards += 1
-            for _ in range(2):
-                self.__cards.append(Card(numCards, 2, "red"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 2, "yellow"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 2, "green"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 2, "blue"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 2, "white"))
-                numCards += 1
-            for _ in range(2):
-                self.__cards.append(Card(numCards, 3, "red"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 3, "yellow"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 3, "green"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 3, "blue"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 3, "white"))
-                numCards += 1
-            for _ in range(2):
-                self.__cards.append(Card(numCards, 4, "red"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 4, "yellow"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 4, "green"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 4, "blue"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 4, "white"))
-                numCards += 1
-            for _ in range(1):
-                self.__cards.append(Card(numCards, 5, "red"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 5, "yellow"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 5, "green"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 5, "blue"))
-                numCards += 1
-                self.__cards.append(Card(numCards, 5, "white"))
-                numCards += 1
-        self.__cardsToDraw = deepcopy(self.__cards)
-        self.__tableCards = {
-            "red": [],
-            "yellow": [],
-            "green": [],
-            "blue": [],
-            "white": []
-        }
+        self.__deck = list(range(len(CARDS)))  # cards in the order they are drawn
+        self.__nextCard = 0                     # position in __deck of the next card to draw
+        self.__heights = [0] * len(COLORS)     # value of the top card of each firework, by color index
+        # Card objects of the table and of the discard pile, kept for the responses
+        self.__tableCards = {color: [] for color in COLORS}
+        self.__discardPile = []
+        self.__discardCounts = [[0] * len(COLORS) for _ in range(self.__MAX_FIREWORKS)] # [value - 1][color index]
 
         ###
         # Init tokens
@@ -157,20 +137,27 @@ class Game(object):
 
         # Init players
         self.__players = []
+        self.__seats = {}  # player name -> index in __players
+        self.__views = {}  # player name -> (hand, Player with the Card objects of the hand) of the last response
         self.__currentPlayer = 0
 
         # init game
         self.__started = False
         self.__lastTurn = False
         self.__lastMoves = 0
+        self.__deckOrder = ()
 
         # score
         self.__score = 0
-        # add actions for each class of data
-        self.__dataActions[GameData.ClientPlayerDiscardCardRequest] = self.__satisfyDiscardRequest
-        self.__dataActions[GameData.ClientGetGameStateRequest] = self.__satisfyShowCardRequest
-        self.__dataActions[GameData.ClientPlayerPlayCardRequest] = self.__satisfyPlayCardRequest
-        self.__dataActions[GameData.ClientHintData] = self.__satisfyHintRequest
+
+        # state versions, to send only the changes since the version known by the client
+        self.__version = 0
+        self.__stateSummary = None
+        self.__stateHistory = OrderedDict()
+        self.__updateVersion()
+
+        # actions done with makePlay, makeDiscard and makeHint, to undo them
+        self.__moves = []
 
     # Request satisfaction methods
     # Each method produces a tuple of ServerToClientData derivates
@@ -180,11 +167,12 @@ class Game(object):
         if type(data) in self.__dataActions:
             if type(data) == GameData.ClientGetGameStateRequest:
                 data.sender = playerName
-            result = self.__dataActions[type(data)](data)
+            result = self.__dataActions[type(data)](self, data)
             if type(data) != GameData.ClientGetGameStateRequest:
-                if len(self.__cardsToDraw) == 0:
+                if self.__nextCard == len(self.__deck):
                     self.__lastTurn = True
                     self.__lastMoves -= 1
+                self.__updateVersion()
             self.__gameOver, self.__score = self.__checkGameEnded()
             if self.__gameOver:
                 logging.info("Game over, people.")
@@ -204,13 +192,13 @@ class Game(object):
         if player.name == data.sender:
             if data.handCardOrdered >= len(player.hand) or data.handCardOrdered < 0:
                 return (GameData.ServerActionInvalid("You don't have that many cards!"), None)
-            card: Card = player.hand[data.handCardOrdered]
-            if not self.__discardCard(card.id, player.name):
+            card: Card = CARDS[player.hand[data.handCardOrdered]]
+            if not self.__discardCard(player, data.handCardOrdered):
                 logging.warning(
                     "Impossible discarding a card: there is no used token available")
                 return (GameData.ServerActionInvalid("You have no used tokens"), None)
             else:
-                self.__drawCard(player.name)
+                self.__drawCard(player)
                 logging.info("Player: " + self.__getCurrentPlayer().name +
                              ": card " + str(card.value) + str(card.color) + " discarded successfully")
                 self.__nextTurn()
@@ -220,10 +208,27 @@ class Game(object):
             return (GameData.ServerActionInvalid("It is not your turn yet"), None)
 
     # Show request
+    # A client that sends the version of its last state gets only the changes since then,
+    # otherwise (or if that version is too old) it gets the full state
     def __satisfyShowCardRequest(self, data: GameData.ClientGetGameStateRequest):
         logging.info("Showing hand to: " + data.sender)
-        currentPlayer, playerList, playerHandSize = self.__getPlayersStatus(data.sender)
-        return (GameData.ServerGameStateData(currentPlayer, playerHandSize, playerList, self.__noteTokens, self.__stormTokens, self.__tableCards, self.__discardPile), None)
+        currentPlayer = self.__players[self.__currentPlayer].name
+        handSize = len(self.__players[self.__seats[data.sender]].hand) if data.sender in self.__seats else 0
+        if data.version in self.__stateHistory:
+            _, _, _, baseHands, baseTable, baseDiscard = self.__stateHistory[data.version]
+            baseHands = dict(baseHands)
+        if data.version not in self.__stateHistory or len(baseHands) != len(self.__players) or any(p.name not in baseHands for p in self.__players):
+            return (GameData.ServerGameStateData(currentPlayer, handSize, self.__getPlayersStatus(data.sender), self.__noteTokens, self.__stormTokens, self.__tableCards, self.__discardPile, self.__version), None)
+        players = []
+        for p in self.__players:
+            if p.name != data.sender and tuple(p.hand) != baseHands[p.name]:
+                players.append(self.__playerView(p))
+        table = {}
+        for i, color in enumerate(COLORS):
+            if self.__heights[i] > baseTable[i]:
+                table[color] = self.__tableCards[color][baseTable[i]:]
+        discard = self.__discardPile[baseDiscard:]
+        return (GameData.ServerGameStateDelta(data.version, self.__version, currentPlayer, handSize, players, self.__noteTokens, self.__stormTokens, table, discard), None)
 
     # Play card request
 
@@ -233,15 +238,14 @@ class Game(object):
         if p.name == data.sender:
             if data.handCardOrdered >= len(p.hand) or data.handCardOrdered < 0:
                 return (GameData.ServerActionInvalid("You don't have that many cards!"), None)
-            card: Card = p.hand[data.handCardOrdered]
-            self.__playCard(p.name, data.handCardOrdered)
-            ok = self.__checkTableCards()
+            card: Card = CARDS[p.hand[data.handCardOrdered]]
+            ok = self.__playCard(p, data.handCardOrdered)
             if not ok:
                 self.__nextTurn()
                 # ! ADDED last param. see GameData relative comment of GameData.ServerPlayerThunderStrike
                 return (None, GameData.ServerPlayerThunderStrike(self.__getCurrentPlayer().name, p.name, card, data.handCardOrdered, len(p.hand)))
             else:
-                logging.info(self.__getCurrentPlayer().name + str(card.value) + str(card.color) + 
+                logging.info(self.__getCurrentPlayer().name + str(card.value) + str(card.color) +
                              ": card played and correctly put on the table")
                 if card.value == 5:
                     logging.info(card.color + " pile has been filled.")
@@ -265,20 +269,16 @@ class Game(object):
                 "All the note tokens have been used. Impossible getting hints")
             return GameData.ServerActionInvalid("All the note tokens have been used"), None
         positions = []
-        destPlayer: Player = None
-        for p in self.__players:
-            if p.name == data.destination:
-                destPlayer = p
-                break
+        destPlayer: Player = self.__getPlayer(data.destination)
         if destPlayer is None:
             return GameData.ServerInvalidDataReceived(data="The selected player does not exist"), None
 
         for i in range(len(destPlayer.hand)):
             if data.type == "color" or data.type == "colour":
-                if data.value == destPlayer.hand[i].color:
+                if data.value == CARDS[destPlayer.hand[i]].color:
                     positions.append(i)
             elif data.type == "value":
-                if data.value == destPlayer.hand[i].value:
+                if data.value == CARDS[destPlayer.hand[i]].value:
                     positions.append(i)
             else:
                 # Backtrack on note token
@@ -297,25 +297,186 @@ class Game(object):
         # ! ADDED last param. see GameData relative comment
         return None, GameData.ServerHintData(data.sender, data.destination, data.type, data.value, positions, self.__getCurrentPlayer().name)
 
+    # Search functions
+    # A search plays ahead on a clone of the game, making and unmaking the actions of the current player without the
+    # GameData messages, the log and the state versions (so a game shown to the clients should not be used)
+    # Only legal actions are made: the make functions return False, and change nothing, for a refused action
+
+    def clone(self):
+        other = Game.__new__(Game)
+        other.__dict__.update(self.__dict__)
+        # the deck is never changed once dealt, the random generator is used only to shuffle it at start
+        other.__heights = list(self.__heights)
+        other.__tableCards = {color: list(cards) for color, cards in self.__tableCards.items()}
+        other.__discardPile = list(self.__discardPile)
+        other.__discardCounts = [list(counts) for counts in self.__discardCounts]
+        other.__players = []
+        for p in self.__players:
+            player = Player(p.name)
+            player.ready = p.ready
+            player.hand = list(p.hand)
+            player.counts = list(p.counts)
+            other.__players.append(player)
+        other.__seats = dict(self.__seats)
+        other.__views = {}
+        other.__stateHistory = OrderedDict(self.__stateHistory)
+        other.__moves = list(self.__moves)
+        return other
+
+    def makePlay(self, position: int) -> bool:
+        player = self.__getCurrentPlayer()
+        if self.__gameOver or position < 0 or position >= len(player.hand):
+            return False
+        saved = self.__saveState()
+        code = player.hand[position]
+        ok = self.__playCard(player, position)
+        if ok and CARDS[code].value == 5 and self.__noteTokens > 0:
+            self.__noteTokens -= 1
+        self.__endMove("play" if ok else "strike", position, code, saved[-1] != self.__nextCard, saved)
+        return True
+
+    def makeDiscard(self, position: int) -> bool:
+        player = self.__getCurrentPlayer()
+        if self.__gameOver or position < 0 or position >= len(player.hand) or self.__noteTokens < 1:
+            return False
+        saved = self.__saveState()
+        code = player.hand[position]
+        self.__discardCard(player, position)
+        self.__drawCard(player)
+        self.__endMove("discard", position, code, saved[-1] != self.__nextCard, saved)
+        return True
+
+    # type: "color" or "value", as in GameData.ClientHintData
+    def makeHint(self, destination: str, type: str, value) -> bool:
+        if self.__gameOver or self.__noteTokens == self.__MAX_NOTE_TOKENS or destination == self.__getCurrentPlayer().name:
+            return False
+        destPlayer = self.__getPlayer(destination)
+        if destPlayer is None:
+            return False
+        if type == "color" or type == "colour":
+            slot = _colorIndex.get(value)
+        elif type == "value" and value in range(1, self.__MAX_FIREWORKS + 1):
+            slot = len(COLORS) + value - 1
+        else:
+            slot = None
+        if slot is None or destPlayer.counts[slot] == 0:
+            return False
+        saved = self.__saveState()
+        self.__noteTokens += 1
+        self.__endMove("hint", None, None, False, saved)
+        return True
+
+    # Returns the codes of the legal actions of the current player, in increasing order, as an array of bytes
+    def legalActions(self):
+        actions = array("B")
+        if self.__gameOver or not self.__started:
+            return actions
+        handSize = len(self.__getCurrentPlayer().hand)
+        actions.extend(range(ACTION_PLAY, ACTION_PLAY + handSize))
+        if self.__noteTokens > 0:
+            actions.extend(range(ACTION_DISCARD, ACTION_DISCARD + handSize))
+        if self.__noteTokens < self.__MAX_NOTE_TOKENS:
+            numPlayers = len(self.__players)
+            for offset in range(1, numPlayers):
+                counts = self.__players[(self.__currentPlayer + offset) % numPlayers].counts
+                base = ACTION_HINT + (offset - 1) * HINTS_PER_PLAYER
+                for h in range(HINTS_PER_PLAYER):
+                    if counts[h]:
+                        actions.append(base + h)
+        return actions
+
+    # Returns the request of the current player for an action code
+    def actionRequest(self, action: int) -> GameData.ClientToServerData:
+        name = self.__getCurrentPlayer().name
+        if action < ACTION_DISCARD:
+            return GameData.ClientPlayerPlayCardRequest(name, action - ACTION_PLAY)
+        if action < ACTION_HINT:
+            return GameData.ClientPlayerDiscardCardRequest(name, action - ACTION_DISCARD)
+        hint = self.__decodeHint(action)
+        if hint is None:
+            raise ValueError("No action " + str(action) + " with " + str(len(self.__players)) + " players")
+        return GameData.ClientHintData(name, *hint)
+
+    # Makes an action given by its code, see the make functions
+    def makeAction(self, action: int) -> bool:
+        if action < ACTION_DISCARD:
+            return self.makePlay(action - ACTION_PLAY)
+        if action < ACTION_HINT:
+            return self.makeDiscard(action - ACTION_DISCARD)
+        hint = self.__decodeHint(action)
+        return hint is not None and self.makeHint(*hint)
+
+    # Returns destination, type and value of a hint code, None if the table has no player for it
+    def __decodeHint(self, action: int):
+        offset, h = divmod(action - ACTION_HINT, HINTS_PER_PLAYER)
+        if offset + 1 >= len(self.__players):
+            return None
+        destination = self.__players[(self.__currentPlayer + offset + 1) % len(self.__players)].name
+        if h < len(COLORS):
+            return destination, "color", COLORS[h]
+        return destination, "value", h - len(COLORS) + 1
+
+    # Undoes the last action made with the make functions
+    def unmake(self):
+        kind, position, code, drew, saved = self.__moves.pop()
+        (self.__noteTokens, self.__stormTokens, self.__currentPlayer, self.__lastTurn, self.__lastMoves,
+         self.__gameOver, self.__score, _) = saved
+        if kind == "hint":
+            return
+        player = self.__getCurrentPlayer()
+        if drew:
+            self.__removeCard(player, len(player.hand) - 1)
+            self.__nextCard -= 1
+        self.__addCard(player, code, position)
+        card = CARDS[code]
+        if kind == "play":
+            self.__heights[_colorIndex[card.color]] -= 1
+            self.__tableCards[card.color].pop()
+        else:
+            self.__discardPile.pop()
+            self.__discardCounts[card.value - 1][_colorIndex[card.color]] -= 1
+
+    def __saveState(self):
+        return (self.__noteTokens, self.__stormTokens, self.__currentPlayer, self.__lastTurn, self.__lastMoves,
+                self.__gameOver, self.__score, self.__nextCard)
+
+    # The end of every action, as in satisfyRequest
+    # drew: True if the player has drawn a card after the action
+    def __endMove(self, kind, position, code, drew, saved):
+        self.__nextTurn()
+        if self.__nextCard == len(self.__deck):
+            self.__lastTurn = True
+            self.__lastMoves -= 1
+        self.__gameOver, self.__score = self.__checkGameEnded()
+        self.__moves.append((kind, position, code, drew, saved))
+
     def isGameOver(self):
         return self.__gameOver
 
     # Player functions
     # players list. Not the best, but there are literally max 5 players and the list should give us the order of connection = the order of the rounds
     def addPlayer(self, name: str):
+        self.__seats.setdefault(name, len(self.__players))
         self.__players.append(Player(name))
 
     def removePlayer(self, name: str):
-        for p in self.__players:
-            if p.name == name:
-                self.__players.remove(p)
-                break
+        if name in self.__seats:
+            seat = self.__seats[name]
+            self.__players.pop(seat)
+            self.__seats = {}
+            for i, p in enumerate(self.__players):
+                self.__seats.setdefault(p.name, i)
+            # a game in progress goes on: the turn stays with the same player, or passes to the next one
+            # if the player leaving had it
+            if seat < self.__currentPlayer:
+                self.__currentPlayer -= 1
+            if self.__currentPlayer >= len(self.__players):
+                self.__currentPlayer = 0
+        self.__updateVersion()
 
     def setPlayerReady(self, name: str):
-        for p in self.__players:
-            if p.name == name:
-                p.ready = True
-                break
+        if name in self.__seats:
+            self.__players[self.__seats[name]].ready = True
 
     def getNumReadyPlayers(self) -> int:
         count = 0
@@ -328,9 +489,18 @@ class Game(object):
         self.__currentPlayer += 1
         self.__currentPlayer %= len(self.__players)
 
-    def start(self):
+    # deck: ids of the cards to draw, in the order of getDeckOrder (to deal a recorded game again), None to shuffle
+    def start(self, deck=None):
         self.__lastMoves = len(self.__players) + 1
-        shuffle(self.__cardsToDraw)
+        order = list(range(len(CARDS)))
+        if deck is None:
+            self.__rng.shuffle(order)
+        else:
+            order = list(deck)
+        self.__deckOrder = tuple(order)
+        # the deck order lists the last card drawn first
+        self.__deck = order[::-1]
+        self.__nextCard = 0
         if len(self.__players) < 2:
             logging.warning("Not enough players!")
             return
@@ -338,78 +508,109 @@ class Game(object):
         if len(self.__players) < 4:
             for p in self.__players:
                 for _ in range(5):
-                    p.takeCard(self.__cardsToDraw)
+                    self.__drawCard(p)
         else:
             for _ in range(4):
                 for p in self.__players:
-                    p.takeCard(self.__cardsToDraw)
+                    self.__drawCard(p)
         self.__started = True
+        self.__updateVersion()
 
+    # The other players, as seen by currentPlayerName
     def __getPlayersStatus(self, currentPlayerName):
         players = []
-        handSize = 0
         for p in self.__players:
             #! I WANT ALSO THE ABSOLUTE ORDER OF PLAYERS
             if p.name == currentPlayerName:  # ! we don't want to cheat
                 # ! so we build an 'empty' Player object for the requesting player
                 tmp_player = Player(currentPlayerName)
                 players.append(tmp_player)
-                handSize = len(p.hand)
             else:
-                players.append(p)
-        return (self.__players[self.__currentPlayer].name, players, handSize)
+                players.append(self.__playerView(p))
+        return players
+
+    # The player as sent to the others, rebuilt only when the hand changes
+    def __playerView(self, p: Player) -> Player:
+        hand = tuple(p.hand)
+        cached = self.__views.get(p.name)
+        if cached is not None and cached[0] == hand:
+            cached[1].ready = p.ready
+            return cached[1]
+        view = Player(p.name)
+        view.ready = p.ready
+        view.hand = self.__toCards(hand)
+        self.__views[p.name] = (hand, view)
+        return view
+
+    def __toCards(self, codes):
+        return [CARDS[code] for code in codes]
+
+    # Everything a state response depends on, the version changes only if this changes
+    def __getStateSummary(self):
+        hands = tuple((p.name, tuple(p.hand)) for p in self.__players)
+        return (self.__currentPlayer, self.__noteTokens, self.__stormTokens, hands, tuple(self.__heights), len(self.__discardPile))
+
+    def __updateVersion(self):
+        summary = self.__getStateSummary()
+        if summary != self.__stateSummary:
+            self.__stateSummary = summary
+            self.__version = next(self.__versions)
+            self.__stateHistory[self.__version] = summary
+            if len(self.__stateHistory) > self.__MAX_STATE_HISTORY:
+                self.__stateHistory.popitem(last=False)
 
     def __getPlayer(self, currentPlayerName: str) -> Player:
-        for p in self.__players:
-            if p.name == currentPlayerName:
-                return p
+        if currentPlayerName in self.__seats:
+            return self.__players[self.__seats[currentPlayerName]]
+        return None
 
     def __getCurrentPlayer(self) -> Player:
         return self.__players[self.__currentPlayer]
 
-    def __discardCard(self, cardID: int, playerName: str) -> bool:
+    def __discardCard(self, player: Player, cardPosition: int) -> bool:
         if self.__noteTokens < 1:  # Ok only if you already used at least 1 token
             return False
         self.__noteTokens -= 1
-        endLoop = False
-        # find player
-        for p in self.__players:
-            if endLoop:
-                break
-            if p.name == playerName:
-                # find card
-                for card in p.hand:
-                    if endLoop:
-                        break
-                    if card.id == cardID:
-                        self.__discardPile.append(card)  # discard
-                        p.hand.remove(card)  # remove from hand
-                        endLoop = True
+        self.__addToDiscardPile(self.__removeCard(player, cardPosition))
         return True
 
-    def __drawCard(self, playerName: str):
-        if len(self.__cardsToDraw) == 0:
+    def __addToDiscardPile(self, code: int):
+        card = CARDS[code]
+        self.__discardPile.append(card)
+        self.__discardCounts[card.value - 1][_colorIndex[card.color]] += 1
+
+    # The hands change only through these two functions, which keep the counts of the player
+    def __addCard(self, player: Player, code: int, position: int):
+        player.hand.insert(position, code)
+        color, value = _countSlots[code]
+        player.counts[color] += 1
+        player.counts[value] += 1
+
+    def __removeCard(self, player: Player, position: int) -> int:
+        code = player.hand.pop(position)
+        color, value = _countSlots[code]
+        player.counts[color] -= 1
+        player.counts[value] -= 1
+        return code
+
+    def __drawCard(self, player: Player):
+        if self.__nextCard == len(self.__deck):
             return
-        card = self.__cardsToDraw.pop()
-        for p in self.__players:
-            if p.name == playerName:
-                p.hand.append(card)
-
-    def __playCard(self, playerName: str, cardPosition: int):
-        p = self.__getPlayer(playerName)
-        self.__tableCards[p.hand[cardPosition].color].append(
-            p.hand[cardPosition])
-        p.hand.pop(cardPosition)
-        if len(self.__cardsToDraw) > 0:
-            p.hand.append(self.__cardsToDraw.pop())
-
-    def __checkTableCards(self) -> bool:
-        for cardPool in self.__tableCards:
-            if len(self.__tableCards[cardPool]) > 0 and self.__tableCards[cardPool][len(self.__tableCards[cardPool]) - 1].value != len(self.__tableCards[cardPool]):
-                card = self.__tableCards[cardPool].pop()
-                self.__discardPile.append(card)
-                self.__strikeThunder()
-                return False
+        self.__addCard(player, self.__deck[self.__nextCard], len(player.hand))
+        self.__nextCard += 1
+
+    # Returns False if the card can't go on its firework: it is discarded and a storm token is used
+    def __playCard(self, player: Player, cardPosition: int) -> bool:
+        code = self.__removeCard(player, cardPosition)
+        self.__drawCard(player)
+        card = CARDS[code]
+        color = _colorIndex[card.color]
+        if card.value != self.__heights[color] + 1:
+            self.__addToDiscardPile(code)
+            self.__strikeThunder()
+            return False
+        self.__tableCards[card.color].append(card)
+        self.__heights[color] += 1
         return True
 
     # assumes cards checked
@@ -421,7 +622,8 @@ class Game(object):
 
     def __checkGameEnded(self):
         ended = True
-        for pile in self.__tableCards:
+        # ! pile is the color name, as in the first version of the game: the game does not end here
+        for pile in COLORS:
             ended = ended and self.__checkFinishedFirework(pile)
         if ended:
             return True, 25
@@ -429,15 +631,48 @@ class Game(object):
             return True, 0
         ended = self.__lastTurn and self.__lastMoves == 0
         if ended:
-            score = 0
-            for pile in self.__tableCards:
-                # ! BUGFIX # instead of 'len(pile)' --> 'pile' is the key (eg. 'red')
-                score += len(self.__tableCards[pile])
-            return True, score
+            return True, sum(self.__heights)
         return False, 0
 
     def getPlayers(self):
         return self.__players
 
+    def getCurrentPlayerName(self):
+        return self.__getCurrentPlayer().name
+
     def getScore(self):
-        return self.__score
\ No newline at end of file
+        return self.__score
+
+    def getNoteTokens(self):
+        return self.__noteTokens
+
+    def getStormTokens(self):
+        return self.__stormTokens
+
+    # Value of the top card of each firework, by color index in COLORS
+    def getFireworks(self):
+        return self.__heights
+
+    # Number of cards left in the deck
+    def getDeckSize(self):
+        return len(self.__deck) - self.__nextCard
+
+    # Version of the state, it changes (and grows) with every change a client can see
+    def getVersion(self):
+        return self.__version
+
+    # ids of the cards of the deck before dealing, the last one is drawn first
+    def getDeckOrder(self):
+        return self.__deckOrder
+
+    # Number of discarded cards of each value and color: [value - 1][color index in COLORS]
+    def getDiscardCounts(self):
+        return self.__discardCounts
+
+    # actions for each class of data, shared by all the games
+    __dataActions = {
+        GameData.ClientPlayerDiscardCardRequest: __satisfyDiscardRequest,
+        GameData.ClientGetGameStateRequest: __satisfyShowCardRequest,
+        GameData.ClientPlayerPlayCardRequest: __satisfyPlayCardRequest,
+        GameData.ClientHintData: __satisfyHintRequest
+    }
\ No newline at end of file
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# Load generator: many bots in a single process, speaking the real protocol to a running server.
+# The bots are seated by the lobby, play random legal moves and start again when a game ends.
+# Run with: python loadgen.py <clients> [tableSize] [delay] [duration]
+#   clients: number of connections
+#   tableSize: players of each table, default 2
+#   delay: seconds a bot waits before each of its moves, default 0
+#   duration: seconds of the test, default 30
+
+import asyncio
+import random
+import sys
+import time
+
+import GameData
+from constants import *
+
+
+
+#######################################################################################################################
+#
+# Class LoadStats: what the bots measured
+#
+# Attributes:
+#   - connected: bots accepted by the server
+#   - games: games ended, counted by the bot whose move ended them
+#   - latencies: seconds between each move and the response of the server to it
+#   - connectTimes: seconds between opening each connection and the acceptance of the server
+#   - errors: count of every error, by description
+#
+#######################################################################################################################
+
+class LoadStats(object):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.connected = 0
+        self.games = 0
+        self.latencies = []
+        self.connectTimes = []
+        self.errors = {}
+
+    def error(self, description: str):
+        self.errors[description] = self.errors.get(description, 0) + 1
+
+
+def percentiles(values, points=(50, 90, 99, 100)):
+    values = sorted(values)
+    if len(values) == 0:
+        return {}
+    return {p: values[min(len(values) - 1, len(values) * p // 100)] for p in points}
+
+
+
+#######################################################################################################################
+#
+# Class Bot: a client that plays random legal moves
+# It asks the server to push the game state after every action (see client.py)
+#
+# Attributes:
+#   - name: name of the player
+#   - tableSize: number of players asked to the lobby
+#   - delay: seconds waited before every move
+#   - stats: the LoadStats shared by the bots
+#
+#######################################################################################################################
+
+class Bot(object):
+
+    def __init__(self, name: str, tableSize: int, delay: float, stats: LoadStats, rng: random.Random) -> None:
+        super().__init__()
+        self.name = name
+        self.tableSize = tableSize
+        self.delay = delay
+        self.stats = stats
+        self.rng = rng
+        self.states = {}        # last game states received, by version
+        self.lastVersion = None
+        self.actedVersion = None
+        self.sentAt = None      # time the pending move has been sent, None if no move is waiting for a response
+        self.connectStart = None
+        self.writer = None
+
+    def send(self, data: GameData.GameData):
+        self.writer.write(data.serialize())
+
+    async def recv(self, reader: asyncio.StreamReader):
+        header = await reader.readexactly(HEADERSIZE)
+        payload = await reader.readexactly(int.from_bytes(header, 'little'))
+        return GameData.GameData.deserialize(header + payload)
+
+    def show(self, version=None):
+        self.send(GameData.ClientGetGameStateRequest(self.name, version))
+
+    def moveAnswered(self):
+        if self.sentAt is not None:
+            self.stats.latencies.append(time.perf_counter() - self.sentAt)
+            self.sentAt = None
+            return True
+        return False
+
+    # Random legal move for the state, in our turn
+    def randomMove(self, state: GameData.ServerGameStateData):
+        moves = [GameData.ClientPlayerPlayCardRequest(self.name, i) for i in range(state.handSize)]
+        if state.usedNoteTokens > 0:
+            moves += [GameData.ClientPlayerDiscardCardRequest(self.name, i) for i in range(state.handSize)]
+        if state.usedNoteTokens < 8:
+            hints = set()
+            for player in state.players:
+                if player.name != self.name:
+                    for card in player.hand:
+                        hints.add((player.name, "value", card.value))
+                        hints.add((player.name, "color", card.color))
+            moves += [GameData.ClientHintData(self.name, destination, type, value) for destination, type, value in sorted(hints, key=str)]
+        return self.rng.choice(moves)
+
+    def move(self, state: GameData.ServerGameStateData):
+        if self.writer.is_closing() or state.version != self.lastVersion:
+            return
+        self.sentAt = time.perf_counter()
+        self.send(self.randomMove(state))
+
+    def manageData(self, data: GameData.GameData):
+        loop = asyncio.get_running_loop()
+        if type(data) is GameData.ServerPlayerConnectionOk:
+            self.stats.connected += 1
+            self.stats.connectTimes.append(time.perf_counter() - self.connectStart)
+            self.send(GameData.ClientPlayerStartRequest(self.name))
+        elif type(data) is GameData.ServerStartGameData:
+            self.send(GameData.ClientPlayerReadyData(self.name))
+            self.show()
+        elif type(data) in (GameData.ServerGameStateData, GameData.ServerGameStateDelta):
+            if type(data) is GameData.ServerGameStateDelta:
+                data = data.apply(self.states[data.baseVersion])
+            self.states[data.version] = data
+            self.lastVersion = data.version
+            while len(self.states) > 8:
+                del self.states[next(iter(self.states))]
+            if data.currentPlayer == self.name and self.sentAt is None and self.actedVersion != data.version:
+                self.actedVersion = data.version
+                loop.call_later(self.delay, self.move, data)
+        elif type(data) in (GameData.ServerActionValid, GameData.ServerPlayerMoveOk, GameData.ServerPlayerThunderStrike):
+            if data.lastPlayer == self.name:
+                self.moveAnswered()
+        elif type(data) is GameData.ServerHintData:
+            if data.source == self.name:
+                self.moveAnswered()
+        elif type(data) in (GameData.ServerActionInvalid, GameData.ServerInvalidDataReceived):
+            self.stats.error(type(data).__name__)
+            self.moveAnswered()
+            self.show()
+        elif type(data) is GameData.ServerGameOver:
+            if self.moveAnswered():
+                self.stats.games += 1
+            # the server deals a new game to the same table
+            self.show()
+
+    async def run(self, deadline: float):
+        self.connectStart = time.perf_counter()
+        try:
+            reader, self.writer = await asyncio.open_connection(HOST, PORT)
+        except OSError as e:
+            self.stats.error("connect: " + type(e).__name__)
+            return
+        self.send(GameData.ClientPlayerAddData(self.name, True, None, self.tableSize))
+        try:
+            while True:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                self.manageData(await asyncio.wait_for(self.recv(reader), timeout))
+        except asyncio.TimeoutError:
+            pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.stats.error("disconnected")
+        finally:
+            self.writer.close()
+
+
+
+#######################################################################################################################
+#
+# Function that runs the bots against the server
+#
+# Args:
+#
+#   - clients: number of bots
+#   - tableSize: players of each table
+#   - delay: seconds every bot waits before a move
+#   - duration: seconds of the test
+#
+# Return:
+#
+#   - stats: the LoadStats of the test
+#
+#######################################################################################################################
+
+async def runLoad(clients: int, tableSize=2, delay=0.0, duration=30.0):
+    stats = LoadStats()
+    deadline = time.perf_counter() + duration
+    rng = random.Random(0)
+    # the names identify the player in its room, the prefix keeps two load generators apart
+    prefix = "bot" + str(random.getrandbits(16)) + "-"
+    bots = [Bot(prefix + str(i), tableSize, delay, stats, random.Random(rng.getrandbits(32))) for i in range(clients)]
+    await asyncio.gather(*(bot.run(deadline) for bot in bots))
+    return stats
+
+
+def printStats(stats: LoadStats, clients: int, duration: float):
+    print("%d/%d connected, %d games, %d moves, %.1f moves/s, %.2f games/s" % (stats.connected, clients, stats.games,
+          len(stats.latencies), len(stats.latencies) / duration, stats.games / duration))
+    for label, values in (("connect", stats.connectTimes), ("move latency", stats.latencies)):
+        p = percentiles(values)
+        if p:
+            print("%s ms: p50 %.2f, p90 %.2f, p99 %.2f, max %.2f" % (label, p[50] * 1000, p[90] * 1000, p[99] * 1000, p[100] * 1000))
+    for description in stats.errors:
+        print("error %s: %d" % (description, stats.errors[description]))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python loadgen.py <clients> [tableSize] [delay] [duration]")
+        exit(-1)
+    clients = int(sys.argv[1])
+    tableSize = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    duration = float(sys.argv[4]) if len(sys.argv) > 4 else 30.0
+    printStats(asyncio.run(runLoad(clients, tableSize, delay, duration)), clients, duration)
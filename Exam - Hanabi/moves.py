@@ -4,18 +4,46 @@ colors = ["red","white","blue","yellow","green"]    # Same as agent.py colors
 
 
 
+#######################################################################################################################
+#
+# Play/discard move table: every row is a move on a card in hand, with a 5x5 matrix for the identities of the card
+# (row = value - 1, column = color index)
+#
+# Fields:
+#   - card: index of the card in the hand
+#   - type: play or discard
+#   - move: True for the identities of the card considered by the move
+#   - chance: chance of every identity of the move
+#   - state: state of every identity (see agent.Player.states)
+#   - critical: 1 for the identities of the move that are critical
+#   - reward: reward of the move, calculated by playCard
+#
+#######################################################################################################################
+
+moveDtype = np.dtype([
+    ("card", "int"),
+    ("type", "U7"),
+    ("move", "bool", (5, 5)),
+    ("chance", "float", (5, 5)),
+    ("state", "uint", (5, 5)),
+    ("critical", "int", (5, 5)),
+    ("reward", "float")
+])
+
+
+
 #######################################################################################################################
 #
 # Function that calculate possible moves and select the effective move to send to the server
 #
 # Args:
 #  
-#   - population: list of possible play/discard moves
+#   - population: table of possible play/discard moves (moveDtype)
 #   - hintMoves: list of possible hint moves
 #   - hint: the number of hint tokens already used
 #   - errors: the red tokens counter
 #   - hand: the current hand of the player, useful for the decisional process
-#   - states: the states for every card in game, useful for the decisional process
+#   - rng: random generator of the pseudo-random selection (np.random by default, a seeded generator to replay a game)
 #
 # Return: 
 # 
@@ -23,7 +51,7 @@ colors = ["red","white","blue","yellow","green"]    # Same as agent.py colors
 #
 #######################################################################################################################
 
-def selectMoves(population, hintMoves, hint, errors, hand, states):
+def selectMoves(population, hintMoves, hint, errors, hand, rng=np.random):
 
     availableMoves = []             # List containing the final moves considered
     
@@ -40,16 +68,16 @@ def selectMoves(population, hintMoves, hint, errors, hand, states):
 
     if hint == 0:       # If we have all hints available we exclude the discard moves
         
-        population = list(filter(lambda n : n["type"] == "play", population))
+        population = population[population["type"] == "play"]
     
     
-    population = playCard(population, hand, e, p, hint, states)     # We assign a reward to every play/discard move
+    population = playCard(population, hand, e, p, hint)     # We assign a reward to every play/discard move
     
     if hint != 8:   # If the hint tokens are different from 0, we calulate the reward also for the hint moves 
         
         hintMoves = sendHint(hintMoves, p)
         
-    availableMoves.extend(population)
+    availableMoves.extend({"card": int(m["card"]), "type": str(m["type"]), "reward": m["reward"]} for m in population)
     availableMoves.extend(hintMoves)
     availableMoves = sorted(availableMoves, key = lambda p: p["reward"], reverse = True)    #We sort by reward
     
@@ -77,7 +105,7 @@ def selectMoves(population, hintMoves, hint, errors, hand, states):
         availableMoves.clear()
         availableMoves.append(tmp[0])
     
-    # We calculate a probability of selection weighted on the rewards, and select pseudo-randomly using the np.random.choice
+    # We calculate a probability of selection weighted on the rewards, and select pseudo-randomly using the choice of rng
     # This is to prevent an always greedy strategy, because can take to a local optima
     for key in availableMoves:
         
@@ -87,7 +115,7 @@ def selectMoves(population, hintMoves, hint, errors, hand, states):
         
         probsMoves.append((key["reward"] + offset * (-1) * int(availableMoves[0]["reward"] < 0))/total)
 
-    move = np.random.choice(availableMoves, 1, probsMoves)
+    move = rng.choice(availableMoves, 1, probsMoves)
 
     return move
 
@@ -96,105 +124,54 @@ def selectMoves(population, hintMoves, hint, errors, hand, states):
 #######################################################################################################################
 #
 # Function that calculates the reward for playing or discarding a given card in hand
+# The rewards of all the moves are calculated at once, the sums are made in the order of the identities (row-major)
 #
 # Args:
 #  
-#   - population: list of available moves according to data
+#   - population: table of available moves according to data (moveDtype)
 #   - hand: cards in hand
 #   - e: parameter for error penalties, used to avoid unfavorable random picks
 #   - p: parameter for token recovery, used to prevent erratic behavior
 #   - hint: number of hint tokens used
-#   - states: the states for every card in game, useful for the decisional process
 #
 # Return: 
 # 
-#   - population: list of available moves with relative reward value attached
+#   - population: table of available moves with relative reward value attached
 #
 #######################################################################################################################
 
-def playCard(population, hand, e, p, hint, states):
-
-    global colors
-
-    # Analyze each move separately
-    for mov in population:
-        
-        # Play moves
-        if mov["type"] == "play":
-            
-            totreward = 0
-            totlosePoints = 0
-            
-            for i in range(len(mov["valcol"])):
-                
-                if mov["valcol"][i][0] == 5:
-                    # Bonus points for playing a 5, thanks to the extra hint token
-                    totreward += (1 + p) * mov["chance"][i]
-                
-                else:
-                    # Bonus points for high probabilities of successful play
-                    totreward += mov["chance"][i]
-            
-            for i in range(5):
-                
-                for j in range(5):
-                    
-                    notInMove = True
-                    
-                    for k in mov["valcol"]:
-                        
-                        if (k[0] == i + 1 and k[1] == colors[j]):
-                            
-                            notInMove = False
-                    # For every possible value not considered by the move, I add a penalty for the possibility 
-                    #   to play critical values
-                    # This penalty is equal to the points that have been surely lost by the move
-                    if notInMove and states[i,j] > 2 and hand[mov["card"]].probs[i,j] != 0:
-                        # Penalties for guesses: if many critical cards would lead to an error if played, penalties become larger           
-                        totlosePoints += (6 - (i + 1)) * (hand[mov["card"]].probs[i,j])
-            # Final reward calculation: we sum the reward and decrease by a penalty (corresponding to the guessing 
-            #   penalty and the wrong move penalty)
-            mov["reward"] = totreward - totlosePoints - (1 - sum(mov["chance"])) * e
-            
-            if sum(mov["chance"]) == 1:
-                # Big bonus for safe moves, useful to make the playable cards disappear quickly from the hand
-                mov["reward"] += 2
-        
-        elif hint != 0:             # if discarding is an option (tokens are not full)
-            
-            totreward = 0
-            totlosePoints = 0
-            
-            for i in range(len(mov["valcol"])):
-                
-                if mov["critical"][i] == 1:
-
-                    # Penalties for discarding critical cards: many lost points lead to larger penalties
-                    # To avoid unnecessary discards of critical cards, the penalty is higher than the number of max points lost
-                    # A critical card can still be discarded in very very difficult situations
-                    totreward += (p - (8 - mov["valcol"][i][0])) * mov["chance"][i]
-                
-                else:
-                    #  If non critical cards, discard is a safe move, but rewarding only if many tokens have been used
-                    totreward += p * mov["chance"][i]
-
-            for i in range(5):
-                
-                for j in range(5):
-                    
-                    notInMove = True
-                    
-                    for k in mov["valcol"]:
-                        
-                        if (k[0] == i+1 and k[1] == colors[j]):
-                            
-                            notInMove = False
-                    
-                    if notInMove and states[i,j] > 2 and hand[mov["card"]].probs[i,j] != 0:
-                        # If card is not playable and critical, penalties depending on the amount of lost points
-                        totlosePoints += (6 - (i + 1)) * (hand[mov["card"]].probs[i,j])
-
-            mov["reward"] = totreward - totlosePoints
+def playCard(population, hand, e, p, hint):
+
+    n = len(population)
+    move = population["move"]
+    chance = population["chance"]
+    probs = hand.probs[population["card"]]
+    values = np.arange(1, 6).reshape(1, 5, 1)
+    play = (population["type"] == "play").reshape(-1, 1, 1)
+
+    # Play moves: bonus points for high probabilities of successful play, and for playing a 5 thanks to the extra
+    #   hint token
+    # Discard moves (only if tokens are not full): penalties for discarding critical cards, many lost points lead to
+    #   larger penalties. To avoid unnecessary discards of critical cards, the penalty is higher than the number of max
+    #   points lost, so a critical card can still be discarded only in very very difficult situations.
+    #   If non critical cards, discard is a safe move, but rewarding only if many tokens have been used
+    reward = np.where(play, np.where(values == 5, (1 + p) * chance, chance),
+                      np.where(population["critical"] == 1, (p - (8 - values)) * chance, p * chance))
+    totreward = np.cumsum(np.where(move, reward, 0).reshape(n, 25), axis = 1)[:, -1]
+
+    # For every possible value not considered by the move, I add a penalty for the possibility to play critical values
+    # This penalty is equal to the points that have been surely lost by the move: if many critical cards would lead to
+    #   an error if played, penalties become larger
+    losePoints = np.where(~move & (population["state"] > 2) & (probs != 0), (6 - values) * probs, 0)
+    totlosePoints = np.cumsum(losePoints.reshape(n, 25), axis = 1)[:, -1]
+
+    # Final reward calculation for play moves: we sum the reward and decrease by a penalty (corresponding to the 
+    #   guessing penalty and the wrong move penalty)
+    # Big bonus for safe moves, useful to make the playable cards disappear quickly from the hand
+    totchance = np.cumsum(np.where(move, chance, 0).reshape(n, 25), axis = 1)[:, -1]
+    play = play.reshape(-1)
+    population["reward"] = np.where(play, totreward - totlosePoints - (1 - totchance) * e, totreward - totlosePoints)
+    population["reward"] += np.where(play & (totchance == 1), 2, 0)
 
     return population
 
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# Binary replay archives
+# An archive is made of two append-only files:
+#   - <path>.hrp: the games, one after the other. Each game is a fixed-size header (seed, players, score, storm tokens,
+#     number of actions, deck order) followed by one fixed-size record per action, so turn t of a game is at
+#     offset + header + t * record
+#   - <path>.hri: the index, the offset of every game in the .hrp file as 8 bytes, so game g is at g * 8
+# The reader maps both files in memory and reads only the game and the turns it is asked for.
+# Run with: python replay.py <path> [game] [turn]
+
+import mmap
+import os
+import struct
+import sys
+
+import GameData
+from constants import COLORS
+from game import Game
+
+MAGIC = b"HRP1"
+DECK_SIZE = 50
+
+_header = struct.Struct("<QBBBBH" + str(DECK_SIZE) + "s") # seed, flags, players, score, storm tokens, actions, deck
+_record = struct.Struct("<BBBB")      # seat, kind | result << 4, argument, target seat
+_offset = struct.Struct("<Q")
+
+_SEEDED = 1
+_NONE = 255 # seat, argument or target that can't be stored in a byte
+
+# Kinds of action
+PLAY = 0
+DISCARD = 1
+HINT_COLOR = 2
+HINT_VALUE = 3
+HINT_OTHER = 4  # a hint of an unknown type, the server refuses it
+LEAVE = 5       # the player left the game, that goes on without it
+
+# Results of an action
+VALID = 0
+STRIKE = 1
+INVALID = 2
+GAME_OVER = 3   # the action ended the game
+
+_colorIndex = {color: i for i, color in enumerate(COLORS)}
+
+
+def _byte(value):
+    return value if type(value) is int and 0 <= value < _NONE else _NONE
+
+
+
+#######################################################################################################################
+#
+# Class GameRecorder: the actions of a game while it is played, in the replay format
+#
+# Attributes:
+#   - seed: seed of the game, None if it is not known
+#   - names: names of the players, by seat
+#   - deck: ids of the cards of the deck, as dealt
+#   - actions: the records of the actions
+#   - finished: True once the action that ended the game has been recorded
+#
+#######################################################################################################################
+
+class GameRecorder(object):
+
+    # game: the game, already started
+    def __init__(self, game: Game, seed=None) -> None:
+        super().__init__()
+        self.seed = seed
+        self.names = [p.name for p in game.getPlayers()]
+        self.deck = bytes(game.getDeckOrder())
+        self.actions = bytearray()
+        self.finished = False
+
+    # Adds a request of a player and the response of the game, the show requests are not recorded
+    # Returns True if the action ended the game
+    def record(self, playerName: str, request: GameData.ClientToServerData, singleData, multipleData) -> bool:
+        if self.finished:
+            return False
+        seat = self.names.index(playerName) if playerName in self.names else _NONE
+        target = _NONE
+        if type(request) is GameData.ClientPlayerPlayCardRequest:
+            kind, arg = PLAY, _byte(request.handCardOrdered)
+        elif type(request) is GameData.ClientPlayerDiscardCardRequest:
+            kind, arg = DISCARD, _byte(request.handCardOrdered)
+        elif type(request) is GameData.ClientHintData:
+            target = self.names.index(request.destination) if request.destination in self.names else _NONE
+            if request.type == "color" or request.type == "colour":
+                kind, arg = HINT_COLOR, _colorIndex.get(request.value, _NONE)
+            elif request.type == "value":
+                kind, arg = HINT_VALUE, _byte(request.value)
+            else:
+                kind, arg = HINT_OTHER, _NONE
+        else:
+            return False
+        if type(multipleData) is GameData.ServerGameOver:
+            result = GAME_OVER
+        elif type(multipleData) is GameData.ServerPlayerThunderStrike:
+            result = STRIKE
+        elif multipleData is None:
+            result = INVALID
+        else:
+            result = VALID
+        self.actions += _record.pack(seat, kind | result << 4, arg, target)
+        self.finished = result == GAME_OVER
+        return self.finished
+
+    # Adds a player leaving the game while it is played, its seat stays its own in the records that follow
+    def recordLeave(self, playerName: str):
+        if self.finished or playerName not in self.names:
+            return
+        self.actions += _record.pack(self.names.index(playerName), LEAVE | VALID << 4, _NONE, _NONE)
+
+    def toBytes(self, score: int, stormTokens: int) -> bytes:
+        seeded = self.seed is not None and 0 <= self.seed < 2 ** 64
+        header = _header.pack(self.seed if seeded else 0, _SEEDED if seeded else 0, len(self.names), score, stormTokens,
+                              len(self.actions) // _record.size, self.deck)
+        return header + self.actions
+
+
+
+#######################################################################################################################
+#
+# Class ReplayWriter: appends the finished games to an archive
+#
+# Attributes:
+#   - path: path of the archive, without extension
+#
+#######################################################################################################################
+
+class ReplayWriter(object):
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self.__data = open(path + ".hrp", "ab")
+        self.__index = open(path + ".hri", "ab")
+        if self.__data.tell() == 0:
+            self.__data.write(MAGIC)
+
+    def write(self, recorder: GameRecorder, game: Game):
+        offset = self.__data.tell()
+        self.__data.write(recorder.toBytes(game.getScore(), game.getStormTokens()))
+        self.__data.flush()
+        # the index is written last, a game is in the archive only when it has been written whole
+        self.__index.write(_offset.pack(offset))
+        self.__index.flush()
+
+    def close(self):
+        self.__data.close()
+        self.__index.close()
+
+
+
+#######################################################################################################################
+#
+# Class ReplayReader: random access to the games and the turns of an archive, through memory maps
+# Only the games written when the reader is opened can be read
+#
+# Attributes:
+#   - path: path of the archive, without extension
+#
+#######################################################################################################################
+
+class ReplayReader(object):
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+        self.__data = self.__map(path + ".hrp")
+        self.__index = self.__map(path + ".hri")
+        if len(self.__index) > 0 and self.__data[:len(MAGIC)] != MAGIC:
+            raise ValueError(path + " is not a replay archive")
+        self.__games = len(self.__index) // _offset.size
+
+    def __map(self, fileName):
+        with open(fileName, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.__games
+
+    def __gameOffset(self, index):
+        if index < 0 or index >= self.__games:
+            raise IndexError("No game " + str(index) + " in " + self.path)
+        return _offset.unpack_from(self.__index, index * _offset.size)[0]
+
+    # Returns a dictionary with the seed (None if unknown), players, score, storm tokens, actions and deck of a game
+    def game(self, index: int):
+        seed, flags, numPlayers, score, stormTokens, actions, deck = _header.unpack_from(self.__data, self.__gameOffset(index))
+        return {
+            "seed": seed if flags & _SEEDED else None,
+            "numPlayers": numPlayers,
+            "score": score,
+            "stormTokens": stormTokens,
+            "actions": actions,
+            "deck": tuple(deck)
+        }
+
+    # Returns the action of a turn of a game as (seat, kind, result, argument, target seat)
+    def action(self, index: int, turn: int):
+        offset = self.__gameOffset(index)
+        actions = _header.unpack_from(self.__data, offset)[5]
+        if turn < 0 or turn >= actions:
+            raise IndexError("No turn " + str(turn) + " in game " + str(index))
+        seat, kind, arg, target = _record.unpack_from(self.__data, offset + _header.size + turn * _record.size)
+        return seat, kind & 15, kind >> 4, arg, target
+
+    def actions(self, index: int):
+        offset = self.__gameOffset(index) + _header.size
+        for turn in range(self.game(index)["actions"]):
+            seat, kind, arg, target = _record.unpack_from(self.__data, offset + turn * _record.size)
+            yield seat, kind & 15, kind >> 4, arg, target
+
+    def close(self):
+        for m in (self.__data, self.__index):
+            if type(m) is mmap.mmap:
+                m.close()
+
+
+
+#######################################################################################################################
+#
+# Function that turns a recorded action back into the request of the player
+#
+# Args:
+#
+#   - names: names of the players, by seat
+#   - action: the action, as returned by ReplayReader.action
+#
+# Return:
+#
+#   - request: the GameData request
+#
+#######################################################################################################################
+
+def toRequest(names, action):
+    seat, kind, _, arg, target = action
+    sender = names[seat] if seat < len(names) else ""
+    if kind == PLAY:
+        return GameData.ClientPlayerPlayCardRequest(sender, arg)
+    elif kind == DISCARD:
+        return GameData.ClientPlayerDiscardCardRequest(sender, arg)
+    destination = names[target] if target < len(names) else ""
+    if kind == HINT_COLOR:
+        return GameData.ClientHintData(sender, destination, "color", COLORS[arg] if arg < len(COLORS) else None)
+    elif kind == HINT_VALUE:
+        return GameData.ClientHintData(sender, destination, "value", arg)
+    return GameData.ClientHintData(sender, destination, None, None)
+
+
+
+#######################################################################################################################
+#
+# Function that plays a recorded game again, up to a turn
+# The players are named player0, player1... by seat
+#
+# Args:
+#
+#   - reader: the archive
+#   - index: the game
+#   - turns: number of actions to replay, None for the whole game
+#
+# Return:
+#
+#   - game: the Game after the replayed actions
+#
+#######################################################################################################################
+
+def replayGame(reader: ReplayReader, index: int, turns=None):
+    header = reader.game(index)
+    names = ["player" + str(seat) for seat in range(header["numPlayers"])]
+    game = Game()
+    for name in names:
+        game.addPlayer(name)
+    game.start(header["deck"])
+    for turn, action in enumerate(reader.actions(index)):
+        if turns is not None and turn >= turns:
+            break
+        sender = names[action[0]] if action[0] < len(names) else ""
+        if action[1] == LEAVE:
+            game.removePlayer(sender)
+        else:
+            game.satisfyRequest(toRequest(names, action), sender)
+    return game
+
+
+if __name__ == '__main__':
+    reader = ReplayReader(sys.argv[1])
+    if len(sys.argv) == 2:
+        print(str(len(reader)) + " games")
+    elif len(sys.argv) == 3:
+        header = reader.game(int(sys.argv[2]))
+        print(header)
+        for turn, action in enumerate(reader.actions(int(sys.argv[2]))):
+            print(turn, action)
+    else:
+        print(reader.action(int(sys.argv[2]), int(sys.argv[3])))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Headless matches: the agents play directly against game.Game in this process, no server, sockets or encoding.
+# Run with: python runner.py [numPlayers] [games] [seed] [replay]
+
+import logging
+import sys
+import time
+import warnings
+
+import numpy as np
+
+import GameData
+import agent
+import replay
+from game import Game
+
+#######################################################################################################################
+#
+# Class Seat: an agent at the table, fed with the same messages client.py gets from the server in pushState mode
+#
+# Attributes:
+#   - name: name of the player
+#   - player: the agent.Player object
+#
+#######################################################################################################################
+
+class Seat(object):
+
+    def __init__(self, cards, name, rng) -> None:
+        super().__init__()
+        self.name = name
+        self.player = agent.Player(cards, name, rng)
+
+    def start(self, state):
+        self.player.startgame(state)
+
+    # Returns the request of the agent if the data makes it play, None otherwise
+    def receive(self, data):
+        if type(data) in (GameData.ServerGameStateData, GameData.ServerActionValid, GameData.ServerPlayerMoveOk,
+                          GameData.ServerPlayerThunderStrike, GameData.ServerHintData):
+            self.player.update(data)
+        if type(data) is GameData.ServerGameStateData and data.currentPlayer == self.name:
+            move = self.player.play()[0]
+            if move["type"] == "hint":
+                return GameData.ClientHintData(self.name, move["player"], move["hintType"], move["value"])
+            elif move["type"] == "play":
+                return GameData.ClientPlayerPlayCardRequest(self.name, move["card"])
+            return GameData.ClientPlayerDiscardCardRequest(self.name, move["card"])
+        return None
+
+
+def showState(game, name):
+    state, _ = game.satisfyRequest(GameData.ClientGetGameStateRequest(name), name)
+    return state
+
+
+
+#######################################################################################################################
+#
+# Function that plays a whole game between agents
+# The messages follow what the server sends: the action results to everybody, then the game state to each player
+#
+# Args:
+#
+#   - numPlayers: number of players of the table
+#   - seed: seed of the game, the same seed replays the same deal and the same moves (None for a random game)
+#   - writer: replay.ReplayWriter the game is recorded to, None to not record it
+#
+# Return:
+#
+#   - result: dictionary with the score, the storm tokens used, the number of actions and the duration of the game
+#     in seconds
+#
+#######################################################################################################################
+
+def runGame(numPlayers=2, seed=None, writer=None):
+    startTime = time.perf_counter()
+    names = ["player" + str(i) for i in range(numPlayers)]
+    game = Game(seed)
+    for name in names:
+        game.addPlayer(name)
+    game.start()
+    recorder = replay.GameRecorder(game, seed)
+    cards = 4 if numPlayers > 3 else 5
+    # every agent gets its own stream, as if it were in its own process
+    streams = np.random.SeedSequence(seed).spawn(numPlayers)
+    seats = [Seat(cards, names[i], np.random.default_rng(streams[i])) for i in range(numPlayers)]
+    requests = []
+    for seat in seats:
+        state = showState(game, seat.name)
+        seat.start(state)
+        requests.append((seat, seat.receive(state)))
+    actions = 0
+    while True:
+        requests = [(seat, request) for seat, request in requests if request is not None]
+        if len(requests) == 0:
+            raise RuntimeError("No player can move")
+        seat, request = requests.pop(0)
+        singleData, multipleData = game.satisfyRequest(request, seat.name)
+        recorder.record(seat.name, request, singleData, multipleData)
+        actions += 1
+        if type(multipleData) is GameData.ServerGameOver:
+            if writer is not None:
+                writer.write(recorder, game)
+            return {"score": multipleData.score, "strikes": game.getStormTokens(), "actions": actions,
+                    "time": time.perf_counter() - startTime}
+        if type(singleData) is GameData.ServerActionInvalid:
+            # client.py asks for the state again, and plays again if it is still its turn
+            requests.append((seat, seat.receive(showState(game, seat.name))))
+        elif type(singleData) is GameData.ServerInvalidDataReceived:
+            # client.py only prints it, the game would be stuck
+            raise RuntimeError("Invalid request from " + seat.name + ": " + str(singleData.data))
+        if multipleData is not None:
+            for other in seats:
+                other.receive(multipleData)
+            for other in seats:
+                requests.append((other, other.receive(showState(game, other.name))))
+
+
+
+#######################################################################################################################
+#
+# Function that plays a series of games and prints the result of each one
+# A game where an agent fails is reported with its error and does not count in the average
+#
+# Args:
+#
+#   - numPlayers: number of players of the table
+#   - games: number of games to play
+#   - seed: seed of the first game, the next ones use the following seeds (None for random games)
+#   - writer: replay.ReplayWriter the games are recorded to, None to not record them
+#
+# Return:
+#
+#   - results: list of the results of runGame, with an "error" entry for the failed games
+#
+#######################################################################################################################
+
+def runGames(numPlayers=2, games=10, seed=None, writer=None):
+    results = []
+    startTime = time.perf_counter()
+    for i in range(games):
+        try:
+            result = runGame(numPlayers, None if seed is None else seed + i, writer)
+            print("Game %d: score %d, %d actions, %.1f ms" % (i, result["score"], result["actions"], result["time"] * 1000))
+        except Exception as e:
+            result = {"error": type(e).__name__ + ": " + str(e)}
+            print("Game %d: failed, %s" % (i, result["error"]))
+        results.append(result)
+    elapsed = time.perf_counter() - startTime
+    scores = [r["score"] for r in results if "error" not in r]
+    if scores:
+        print("Average score %.2f over %d games (%d failed), %.1f games/s" % (sum(scores) / len(scores), len(scores),
+              games - len(scores), games / elapsed))
+    return results
+
+
+if __name__ == '__main__':
+    logging.disable(logging.WARNING) # the game logs every invalid action
+    warnings.filterwarnings("ignore", category=RuntimeWarning) # the agent counts cards in unsigned arrays
+    numPlayers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] != "-" else None
+    writer = replay.ReplayWriter(sys.argv[4]) if len(sys.argv) > 4 else None
+    runGames(numPlayers, games, seed, writer)
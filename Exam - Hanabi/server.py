@@ -1,166 +1,721 @@
+import asyncio
+import multiprocessing
 import os
-import GameData
+import re
 import socket
+import time
+import zlib
+import GameData
+import replay
 from game import Game
-from game import Player
 import threading
 from constants import *
 import logging
 import sys
 
-mutex = threading.Lock()
 # SERVER
-playerConnections = {}
-game = Game()
-
-mutex = threading.Lock()
-
-playersOk = []
-
 statuses = [
     "Lobby",
     "Game"
 ]
-status = statuses[0]
 
-commandQueue = {}
 numPlayers = 2
+MAX_PLAYERS = 5
+
+# Slow clients: every connection has its own bounded queue of messages to send, so nobody waits for a slow client
+SEND_QUEUE_SIZE = 1024  # a client with this many messages not sent yet is disconnected
+WRITE_TIMEOUT = 30      # seconds: a client that doesn't read what has been written for this long is disconnected
+IDLE_TIMEOUT = None     # seconds: a client that doesn't send anything for this long is disconnected (None: never)
+
+rooms = {}          # every table hosted by the server, by id
+openRooms = {}      # matchmaking: tables still waiting for players, by requested number of players
+roomCount = 0
+tablePrefix = "table" # name of the matchmaking rooms, followed by their number
+acceptorLobby = False # sharded mode: the acceptor fills the matchmaking rooms, named with tablePrefix
+replayPath = "games"  # archive of the replays of the finished games (see replay.py)
+replayWriter = None
+
+workers = []        # sharded mode: the worker processes, each one hosting its own rooms
+stats = {           # counters of this process, sent to the parent by the workers
+    "connections": 0,
+    "dropped": 0,
+    "games": 0,
+    "actions": 0,
+    "cachedStates": 0
+}
+
+
+class Connection(object):
+    '''
+    A client connection, served by two tasks: one reads the requests and one writes the responses.
+    send never blocks, the data is queued and written by the writer task as fast as the client reads it.
+    A client that falls behind (SEND_QUEUE_SIZE messages queued, or WRITE_TIMEOUT seconds to read a message) or that
+    stays silent for IDLE_TIMEOUT seconds is dropped: the connection is aborted, so recv returns None and the player
+    leaves the room as if it had disconnected.
+    '''
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        super().__init__()
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.__queue = asyncio.Queue(SEND_QUEUE_SIZE + 1) # room for the closing None
+        self.__dropped = False
+        self.__closed = False
+        self.__writerTask = asyncio.get_running_loop().create_task(self.__writeLoop())
+
+    def send(self, data: GameData.GameData):
+        if not self.__dropped:
+            self.sendFrame(data.serialize())
+
+    def sendFrame(self, frame: bytes):
+        '''
+        Sends data already serialized.
+        '''
+        if self.__dropped or self.__closed:
+            return
+        if self.__queue.qsize() >= SEND_QUEUE_SIZE:
+            self.drop("too many messages not sent")
+            return
+        self.__queue.put_nowait(frame)
+
+    async def recv(self):
+        '''
+        Returns the next GameData object sent by the client, None if the connection has been closed.
+        '''
+        try:
+            header = await asyncio.wait_for(self.reader.readexactly(HEADERSIZE), IDLE_TIMEOUT)
+            payload = await self.reader.readexactly(int.from_bytes(header, 'little'))
+        except asyncio.TimeoutError:
+            self.drop("idle")
+            return None
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        return GameData.GameData.deserialize(header + payload)
+
+    def close(self):
+        # whatever is already queued is still sent
+        # a connection can be closed twice (e.g. a spectator of a room that closes, then by its own task)
+        if self.__closed:
+            return
+        self.__closed = True
+        if not self.__dropped:
+            self.__queue.put_nowait(None)
+
+    def drop(self, reason: str):
+        if self.__dropped:
+            return
+        self.__dropped = True
+        stats["dropped"] += 1
+        logging.warning("Dropping " + str(self.addr) + ": " + reason)
+        if self.__writerTask is not asyncio.current_task():
+            self.__writerTask.cancel()
+        self.writer.transport.abort()
+
+    async def __writeLoop(self):
+        try:
+            while True:
+                data = await self.__queue.get()
+                if data is None:
+                    break
+                self.writer.write(data)
+                await asyncio.wait_for(self.writer.drain(), WRITE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.drop("not reading")
+        except ConnectionError:
+            pass
+        finally:
+            self.writer.close()
+
+
+class Room(object):
+    '''
+    A table of the server: its own game, players and lobby.
+    id: the room id.
+    numPlayers: the game starts when at least numPlayers players are connected and all of them are ready.
+    matchmaking: True if the room has been created by the lobby, that fills it with exactly numPlayers players.
+    '''
+    def __init__(self, id: str, numPlayers: int, matchmaking: bool) -> None:
+        super().__init__()
+        self.id = id
+        self.numPlayers = numPlayers
+        self.matchmaking = matchmaking
+        self.game = Game()
+        self.recorder = None
+        self.playerConnections = {}
+        self.playersOk = []
+        self.status = statuses[0]
+        self.commandQueue = {}
+        # players that asked to receive the game state after every action,
+        # with the version of the last state they got (the pushed states are deltas from that one)
+        self.pushStates = {}
+        # state responses already serialized, by (player, version asked), with the game version they were made at
+        # emptied by every request that can change the game
+        self.stateCache = {}
+        # connections watching the room, they get what is broadcast to the players
+        self.spectators = []
+
+    def isOpen(self) -> bool:
+        maxPlayers = self.numPlayers if self.matchmaking else MAX_PLAYERS
+        return self.status == "Lobby" and len(self.playerConnections) < maxPlayers
 
+    def isEmpty(self) -> bool:
+        return len(self.playerConnections) == 0
 
-def manageConnection(conn: socket, addr):
-    global status
-    global game
-    with conn:
-        logging.info("Connected by: " + str(addr))
-        keepActive = True
-        playerName = ""
-        while keepActive:
-            print("SERVER WAITING")
-            data = conn.recv(DATASIZE)
+    def log(self, message: str):
+        logging.info("Room " + self.id + ": " + message)
 
-            mutex.acquire(True)
+    def trackState(self, playerName, data):
+        if playerName in self.pushStates and type(data) in (GameData.ServerGameStateData, GameData.ServerGameStateDelta):
+            self.pushStates[playerName] = data.version
 
+    def getState(self, playerName: str, version=None):
+        '''
+        Returns the serialized response to a show request of the player (the state, or the changes since version)
+        and the version of the state, None if the game has no state to show.
+        Served from the cache while the game does not change.
+        '''
+        key = (playerName, version)
+        cached = self.stateCache.get(key)
+        if cached is not None and cached[0] == self.game.getVersion():
+            stats["cachedStates"] += 1
+            return cached[1], cached[2]
+        state, _ = self.game.satisfyRequest(GameData.ClientGetGameStateRequest(playerName, version), playerName)
+        if type(state) not in (GameData.ServerGameStateData, GameData.ServerGameStateDelta):
+            return None
+        self.stateCache[key] = (self.game.getVersion(), state.serialize(), state.version)
+        return self.stateCache[key][1], state.version
+
+    def sendState(self, playerName: str, version=None) -> bool:
+        response = self.getState(playerName, version)
+        if response is None:
+            return False
+        frame, stateVersion = response
+        if playerName in self.pushStates:
+            self.pushStates[playerName] = stateVersion
+        self.playerConnections[playerName].sendFrame(frame)
+        return True
+
+    def pushState(self):
+        for playerName in self.pushStates:
+            self.sendState(playerName, self.pushStates[playerName])
+
+    def broadcast(self, data: GameData.GameData):
+        # serialized once, every connection queues the same bytes
+        frame = data.serialize()
+        for id in self.playerConnections:
+            self.playerConnections[id].sendFrame(frame)
+        for conn in self.spectators:
+            conn.sendFrame(frame)
+
+    def addSpectator(self, conn: Connection, name: str):
+        self.spectators.append(conn)
+        self.log("Spectator connected: " + name)
+        conn.send(GameData.ServerSpectatorConnectionOk(self.id, [p.name for p in self.game.getPlayers()]))
+
+    def removeSpectator(self, conn: Connection):
+        if conn in self.spectators:
+            self.spectators.remove(conn)
+
+    def removePlayer(self, playerName: str):
+        del self.playerConnections[playerName]
+        self.pushStates.pop(playerName, None)
+        logging.warning("Room " + self.id + ": Player disconnected: " + playerName)
+        if self.recorder is not None:
+            # the replay removes the player at the same turn
+            self.recorder.recordLeave(playerName)
+        self.game.removePlayer(playerName)
+        self.stateCache.clear()
+        if self.status == "Game" and not self.isEmpty() and not self.game.isGameOver():
+            # the turn may have passed to someone else
+            self.pushState()
+        elif acceptorLobby and self.matchmaking and self.recorder is None and not self.isEmpty():
+            # nobody refills the tables of the acceptor: the players left play without the one that left
+            if len(self.playerConnections) < 2:
+                for conn in self.playerConnections.values():
+                    conn.send(GameData.ServerActionInvalid("The other players left the table, connect again."))
+                    conn.close()
+                return
+            self.numPlayers = len(self.playerConnections)
+            self.startIfReady()
+
+    def startIfReady(self):
+        if len(self.game.getPlayers()) == self.game.getNumReadyPlayers() and len(self.game.getPlayers()) >= self.numPlayers:
+            listNames = []
+            for player in self.game.getPlayers():
+                listNames.append(player.name)
+            self.log("Game start! Between: " + str(listNames))
+            self.broadcast(GameData.ServerStartGameData(listNames))
+            self.startGame()
+
+    def startGame(self):
+        self.game.start()
+        self.stateCache.clear()
+        self.recorder = replay.GameRecorder(self.game)
+
+    def satisfyRequest(self, data: GameData.GameData, playerName: str):
+        if type(data) is not GameData.ClientGetGameStateRequest:
+            self.stateCache.clear()
+        singleData, multipleData = self.game.satisfyRequest(data, playerName)
+        if self.recorder.record(playerName, data, singleData, multipleData) and replayWriter is not None:
+            replayWriter.write(self.recorder, self.game)
+        return singleData, multipleData
+
+    # Handles a request of a client, returns False if the connection has to be closed
+    def manageData(self, conn: Connection, playerName: str, data: GameData.GameData) -> bool:
+        if self.status == "Lobby":
+            if type(data) is GameData.ClientPlayerAddData:
+                playerName = data.sender
+                if playerName in self.playerConnections.keys() or playerName == "" and playerName is None:
+                    logging.warning("Room " + self.id + ": Duplicate player: " + playerName)
+                    conn.send(GameData.ServerActionInvalid(
+                        "Player with that name already registered."))
+                    return False
+                self.commandQueue[playerName] = []
+                self.playerConnections[playerName] = conn
+                if data.pushState:
+                    self.pushStates[playerName] = None
+                self.log("Player connected: " + playerName)
+                self.game.addPlayer(playerName)
+                conn.send(GameData.ServerPlayerConnectionOk(playerName, self.id))
+            elif type(data) is GameData.ClientPlayerStartRequest:
+                self.game.setPlayerReady(playerName)
+                self.log("Player ready: " + playerName)
+                conn.send(GameData.ServerPlayerStartRequestAccepted(
+                    len(self.game.getPlayers()), self.game.getNumReadyPlayers()))
+                self.startIfReady()
+
+            # This ensures every player is ready to send requests
+            elif type(data) is GameData.ClientPlayerReadyData:
+                self.playersOk.append(1)
+            # If every player is ready to send requests, then the game can start
+            if len(self.playersOk) == len(self.game.getPlayers()):
+                self.status = "Game"
+                for player in self.commandQueue:
+                    for cmd in self.commandQueue[player]:
+                        singleData, multipleData = self.satisfyRequest(cmd, player)
+                        if singleData is not None:
+                            self.trackState(player, singleData)
+                            self.playerConnections[player].send(singleData)
+                        if multipleData is not None:
+                            self.broadcast(multipleData)
+                            if not self.game.isGameOver():
+                                self.pushState()
+                self.commandQueue.clear()
+            elif type(data) is not GameData.ClientPlayerAddData and type(
+                    data) is not GameData.ClientPlayerStartRequest and type(
+                    data) is not GameData.ClientPlayerReadyData:
+                self.commandQueue[playerName].append(data)
+        # In game
+        elif self.status == "Game":
+            stats["actions"] += 1
+            if type(data) is GameData.ClientGetGameStateRequest and self.sendState(playerName, data.version):
+                return True
+            singleData, multipleData = self.satisfyRequest(data, playerName)
+            if singleData is not None:
+                self.trackState(playerName, singleData)
+                conn.send(singleData)
+            if multipleData is not None:
+                self.broadcast(multipleData)
+                if self.game.isGameOver():
+                    stats["games"] += 1
+                    self.log("Game over")
+                    self.log("Game score: " + str(self.game.getScore()))
+                    players = self.game.getPlayers()
+                    self.game = Game()
+                    for player in players:
+                        self.log("Starting new game")
+                        self.game.addPlayer(player.name)
+                    self.startGame()
+                else:
+                    self.pushState()
+        return True
+
+
+#######################################################################################################################
+#
+# Function that finds the room for a connection request
+# A request with a room id joins (or creates) that room, otherwise the lobby puts the player
+# in a table waiting for the requested number of players, or opens a new one
+#
+# Args:
+#
+#   - data: the connection request
+#
+# Return:
+#
+#   - room: the room to join, None if it can't be joined or the number of players is not between 2 and MAX_PLAYERS
+#
+#######################################################################################################################
+
+def findRoom(data: GameData.ClientPlayerAddData):
+    global roomCount
+    size = numPlayers if data.numPlayers is None else data.numPlayers
+    if size < 2 or size > MAX_PLAYERS:
+        return None
+    if data.room is not None:
+        if data.room not in rooms:
+            # the acceptor seats its lobby players in rooms named with the prefix of the worker
+            rooms[data.room] = Room(data.room, size, acceptorLobby and data.room.startswith(tablePrefix))
+        room = rooms[data.room]
+        return room if room.isOpen() else None
+    room = openRooms.get(size)
+    if room is None or not room.isOpen():
+        roomCount += 1
+        room = Room(tablePrefix + str(roomCount), size, True)
+        rooms[room.id] = room
+        openRooms[size] = room
+    return room
+
+
+def closeRoom(room: Room):
+    del rooms[room.id]
+    if openRooms.get(room.numPlayers) is room:
+        del openRooms[room.numPlayers]
+    for conn in room.spectators:
+        conn.close()
+    room.log("Closed")
+
+
+# first: the first request of the client, if it has already been read by the front acceptor
+async def manageConnection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, first=None):
+    conn = Connection(reader, writer)
+    logging.info("Connected by: " + str(conn.addr))
+    stats["connections"] += 1
+    playerName = ""
+    room = None
+    spectator = False
+    try:
+        while True:
+            if first is not None:
+                data, first = first, None
+            else:
+                data = await conn.recv()
             if not data:
-                del playerConnections[playerName]
-                logging.warning("Player disconnected: " + playerName)
-                game.removePlayer(playerName)
-                if len(playerConnections) == 0:
-                    logging.info("Shutting down server")
-                    os._exit(0)
-                keepActive = False
+                return
+            logging.debug("Received %s from %s", type(data).__name__, data.sender)
+            if spectator:
+                conn.send(GameData.ServerActionInvalid("Spectators can't play."))
+                continue
+            if room is None and type(data) is GameData.ClientSpectatorAddData:
+                room = rooms.get(data.room)
+                if room is None:
+                    conn.send(GameData.ServerActionInvalid("Room not available."))
+                    return
+                spectator = True
+                room.addSpectator(conn, data.sender)
+                continue
+            if room is None:
+                if type(data) is not GameData.ClientPlayerAddData:
+                    conn.send(GameData.ServerActionInvalid("Send a connection request first."))
+                    continue
+                room = findRoom(data)
+                if room is None:
+                    conn.send(GameData.ServerActionInvalid("Room not available."))
+                    return
+            if not room.manageData(conn, playerName, data):
+                return
+            if type(data) is GameData.ClientPlayerAddData and room.playerConnections.get(data.sender) is conn:
+                playerName = data.sender
+    except Exception:
+        # malformed requests (decode errors) and bugs: the connection is closed, the room goes on without it
+        logging.exception("Error serving " + str(conn.addr))
+    finally:
+        if spectator:
+            room.removeSpectator(conn)
+        elif room is not None:
+            if room.playerConnections.get(playerName) is conn:
+                room.removePlayer(playerName)
+            if room.isEmpty() and rooms.get(room.id) is room:
+                closeRoom(room)
+        conn.close()
+
+
+#######################################################################################################################
+#
+# Sharded mode
+# The parent process accepts the connections and reads the first request of every client, then hands the socket
+# (and the request) over to one of the workers, that serves it as a normal connection.
+# Every player of a table must land on the same worker:
+#   - a request with a room id goes to the worker chosen by the hash of the id, or to the worker hosting it if it is
+#     a matchmaking table (named worker<index>-table<number>), so that spectators can watch the lobby tables
+#   - the acceptor runs the lobby: it holds the sockets of the matchmaking requests until their table is full, then
+#     hands the whole table over to the next worker, in turn, as a room named after it
+#
+#######################################################################################################################
+
+class Router(object):
+    '''
+    Picks the worker of every connection request and fills the matchmaking tables, in the acceptor process.
+    lobby: the tables being filled, by number of players, as lists of (socket, request).
+    '''
+    def __init__(self, numWorkers: int) -> None:
+        super().__init__()
+        self.numWorkers = numWorkers
+        self.nextWorker = 0
+        self.tableCount = 0
+        self.lobby = {}
+
+    # Returns the worker hosting a matchmaking table, None if the room is not one
+    def tableWorker(self, room: str):
+        # the matchmaking tables are named after the worker hosting them (see runWorker)
+        table = re.match(r"worker(\d+)-table", room)
+        if table is not None and int(table.group(1)) < self.numWorkers:
+            return int(table.group(1))
+        return None
+
+    # data: a ClientPlayerAddData or a ClientSpectatorAddData with a room id (it goes where the players of its room are)
+    def route(self, data: GameData.ClientPlayerAddData) -> int:
+        worker = self.tableWorker(data.room)
+        return worker if worker is not None else zlib.crc32(data.room.encode()) % self.numWorkers
+
+    def isSeated(self, size: int, name: str) -> bool:
+        return any(request.sender == name for _, request in self.lobby.get(size, []))
+
+    # Seats a player at the table of its size
+    # Returns (worker, room id, players) once the table is full, None while it is still waiting
+    def seat(self, sock: socket.socket, data: GameData.ClientPlayerAddData, size: int):
+        table = self.lobby.setdefault(size, [])
+        table.append((sock, data))
+        if len(table) < size:
+            return None
+        del self.lobby[size]
+        worker = self.nextWorker
+        self.nextWorker = (worker + 1) % self.numWorkers
+        self.tableCount += 1
+        return worker, "worker" + str(worker) + "-table" + str(self.tableCount), table
+
+    def leave(self, sock: socket.socket):
+        for table in self.lobby.values():
+            for seat in table:
+                if seat[0] is sock:
+                    table.remove(seat)
+                    return
+
+
+async def recvExactly(loop: asyncio.AbstractEventLoop, sock: socket.socket, size: int) -> bytes:
+    # recv never reads past the requested size, so nothing of the following requests is consumed here
+    data = b''
+    while len(data) < size:
+        chunk = await loop.sock_recv(sock, size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def watchSeat(loop: asyncio.AbstractEventLoop, sock: socket.socket, router: Router):
+    # a player waiting for its table that disconnects leaves it; one that already sends its next request is not
+    # watched anymore, the request stays in the socket for the worker
+    def check():
+        try:
+            left = sock.recv(1, socket.MSG_PEEK) == b''
+        except BlockingIOError:
+            return
+        except OSError:
+            left = True
+        loop.remove_reader(sock.fileno())
+        if left:
+            router.leave(sock)
+            sock.close()
+
+    loop.add_reader(sock.fileno(), check)
+
+
+# Returns True if the socket is held until the table of the player is full
+async def seatPlayer(loop: asyncio.AbstractEventLoop, sock: socket.socket, data: GameData.ClientPlayerAddData,
+                     router: Router, channels: list) -> bool:
+    size = numPlayers if data.numPlayers is None else data.numPlayers
+    if size < 2 or size > MAX_PLAYERS:
+        await loop.sock_sendall(sock, GameData.ServerActionInvalid("Room not available.").serialize())
+        return False
+    if router.isSeated(size, data.sender):
+        await loop.sock_sendall(sock, GameData.ServerActionInvalid("Player with that name already registered.").serialize())
+        return False
+    table = router.seat(sock, data, size)
+    if table is None:
+        watchSeat(loop, sock, router)
+        return True
+    worker, room, players = table
+    for seatSock, request in players:
+        if seatSock is not sock:
+            loop.remove_reader(seatSock.fileno())
+        # the worker seats the player in the room named after the table
+        frame = GameData.ClientPlayerAddData(request.sender, request.pushState, room, size).serialize()
+        socket.send_fds(channels[worker], [frame], [seatSock.fileno()])
+        if seatSock is not sock:
+            seatSock.close()
+    return False
+
+
+async def routeConnection(loop: asyncio.AbstractEventLoop, sock: socket.socket, addr, router: Router, channels: list):
+    held = False
+    try:
+        header = await recvExactly(loop, sock, HEADERSIZE)
+        if header is not None and HEADERSIZE + int.from_bytes(header, 'little') > DATASIZE:
+            # the request and its socket are handed over in a single message of at most DATASIZE bytes
+            await loop.sock_sendall(sock, GameData.ServerActionInvalid("Request too long.").serialize())
+            return
+        payload = None if header is None else await recvExactly(loop, sock, int.from_bytes(header, 'little'))
+        if payload is not None:
+            data = GameData.GameData.deserialize(header + payload)
+            if type(data) is GameData.ClientPlayerAddData and data.room is None:
+                held = await seatPlayer(loop, sock, data, router, channels)
+            elif type(data) is GameData.ClientPlayerAddData and router.tableWorker(data.room) is not None:
+                # only the lobby seats players at the matchmaking tables
+                await loop.sock_sendall(sock, GameData.ServerActionInvalid("Room not available.").serialize())
+            elif type(data) is GameData.ClientPlayerAddData or type(data) is GameData.ClientSpectatorAddData and data.room is not None:
+                socket.send_fds(channels[router.route(data)], [header + payload], [sock.fileno()])
             else:
-                print(
-                    f"SERVER PROCESSING {GameData.GameData.deserialize(data)}")
-                data = GameData.GameData.deserialize(data)
-                print(f"SERVER RECEIVED {type(data)} from {data.sender}")
-                if status == "Lobby":
-                    if type(data) is GameData.ClientPlayerAddData:
-                        playerName = data.sender
-                        commandQueue[playerName] = []
-                        if playerName in playerConnections.keys() or playerName == "" and playerName is None:
-                            logging.warning("Duplicate player: " + playerName)
-                            conn.send(GameData.ServerActionInvalid(
-                                "Player with that name already registered.").serialize())
-                            mutex.release()
-                            return
-                        playerConnections[playerName] = (conn, addr)
-                        logging.info("Player connected: " + playerName)
-                        game.addPlayer(playerName)
-                        conn.send(GameData.ServerPlayerConnectionOk(
-                            playerName).serialize())
-                    elif type(data) is GameData.ClientPlayerStartRequest:
-                        game.setPlayerReady(playerName)
-                        logging.info("Player ready: " + playerName)
-                        conn.send(GameData.ServerPlayerStartRequestAccepted(
-                            len(game.getPlayers()), game.getNumReadyPlayers()).serialize())
-
-                        if len(game.getPlayers()) == game.getNumReadyPlayers() and len(game.getPlayers()) >= numPlayers:
-                            listNames = []
-                            for player in game.getPlayers():
-                                listNames.append(player.name)
-                            logging.info(
-                                "Game start! Between: " + str(listNames))
-                            for player in playerConnections:
-                                playerConnections[player][0].send(
-                                    GameData.ServerStartGameData(listNames).serialize())
-                            game.start()
-
-                    # This ensures every player is ready to send requests
-                    elif type(data) is GameData.ClientPlayerReadyData:
-                        playersOk.append(1)
-                    # If every player is ready to send requests, then the game can start
-                    if len(playersOk) == len(game.getPlayers()):
-                        status = "Game"
-                        for player in commandQueue:
-                            for cmd in commandQueue[player]:
-                                singleData, multipleData = game.satisfyRequest(
-                                    cmd, player)
-                                if singleData is not None:
-                                    playerConnections[player][0].send(
-                                        singleData.serialize())
-                                if multipleData is not None:
-                                    for id in playerConnections:
-                                        playerConnections[id][0].send(
-                                            multipleData.serialize())
-                                        if game.isGameOver():
-                                            os._exit(0)
-                        commandQueue.clear()
-                    elif type(data) is not GameData.ClientPlayerAddData and type(
-                            data) is not GameData.ClientPlayerStartRequest and type(
-                            data) is not GameData.ClientPlayerReadyData:
-                        commandQueue[playerName].append(data)
-                # In game
-                elif status == "Game":
-                    singleData, multipleData = game.satisfyRequest(
-                        data, playerName)
-                    if singleData is not None:
-                        conn.send(singleData.serialize())
-                    if multipleData is not None:
-                        for id in playerConnections:
-                            playerConnections[id][0].send(
-                                multipleData.serialize())
-                            if game.isGameOver():
-                                logging.info("Game over")
-                                logging.info("Game score: " +
-                                             str(game.getScore()))
-                                # os._exit(0)
-                                players = game.getPlayers()
-                                game = Game()
-                                for player in players:
-                                    logging.info("Starting new game")
-                                    game.addPlayer(player.name)
-                                game.start()
-            mutex.release()
-
-
-def manageInput():
+                await loop.sock_sendall(sock, GameData.ServerActionInvalid("Send a connection request first.").serialize())
+    except ConnectionError as e:
+        logging.warning("Connection dropped by the acceptor: " + str(e))
+    except Exception:
+        # malformed requests (decode errors) and bugs: the connection is closed, the acceptor goes on
+        logging.exception("Error routing " + str(addr))
+    finally:
+        # the worker has its own copy of the socket
+        if not held:
+            sock.close()
+
+
+async def acceptConnections(channels: list):
+    loop = asyncio.get_running_loop()
+    router = Router(len(channels))
+    listener = socket.create_server((HOST, PORT))
+    listener.setblocking(False)
+    logging.info("Hanabi server started on " + HOST + ":" + str(PORT) + " with " + str(len(channels)) + " workers")
+    while True:
+        sock, addr = await loop.sock_accept(listener)
+        loop.create_task(routeConnection(loop, sock, addr, router, channels))
+
+
+async def serveHandoffs(channel: socket.socket, index: int, statsQueue: multiprocessing.Queue):
+    loop = asyncio.get_running_loop()
+
+    async def serve(sock: socket.socket, frame: bytes):
+        try:
+            first = GameData.GameData.deserialize(frame)
+        except Exception:
+            logging.exception("Error reading a request handed over by the acceptor")
+            sock.close()
+            return
+        reader, writer = await asyncio.open_connection(sock=sock)
+        await manageConnection(reader, writer, first)
+
+    def receive():
+        try:
+            frame, fds, flags, _ = socket.recv_fds(channel, DATASIZE, 1)
+        except OSError:
+            logging.exception("Error receiving a connection from the acceptor")
+            return
+        if not fds:
+            # the acceptor is gone
+            loop.remove_reader(channel.fileno())
+            return
+        sock = socket.socket(fileno=fds[0])
+        if flags & socket.MSG_TRUNC:
+            # the acceptor refuses longer requests, but a cut request must not be read as a valid one
+            logging.warning("Request handed over longer than " + str(DATASIZE) + " bytes, dropping the connection")
+            sock.close()
+            return
+        sock.setblocking(False)
+        loop.create_task(serve(sock, frame))
+
+    loop.add_reader(channel.fileno(), receive)
+    while True:
+        await asyncio.sleep(1)
+        statsQueue.put((index, dict(stats, rooms=len(rooms))))
+
+
+def runWorker(index: int, channel: socket.socket, statsQueue: multiprocessing.Queue):
+    global tablePrefix, acceptorLobby, replayWriter
+    tablePrefix = "worker" + str(index) + "-table"
+    acceptorLobby = True
+    # an archive is written by a single process
+    replayWriter = replay.ReplayWriter(replayPath + ".worker" + str(index))
+    asyncio.run(serveHandoffs(channel, index, statsQueue))
+
+
+def collectStats(statsQueue: multiprocessing.Queue, workerStats: dict):
+    while True:
+        index, counters = statsQueue.get()
+        workerStats[index] = counters
+
+
+#######################################################################################################################
+#
+# Function that sums the counters of every worker (or of this process, if the server is not sharded)
+#
+# Args:
+#
+#   - workerStats: last counters received from each worker
+#   - startTime: time the server has been started at
+#
+# Return:
+#
+#   - total: the summed counters, with the games per second since the start
+#
+#######################################################################################################################
+
+def aggregateStats(workerStats: dict, startTime: float):
+    if workers:
+        total = {}
+        for counters in list(workerStats.values()):
+            for key in counters:
+                total[key] = total.get(key, 0) + counters[key]
+    else:
+        total = dict(stats, rooms=len(rooms))
+    total["games/s"] = round(total.get("games", 0) / (time.time() - startTime), 2)
+    return total
+
+
+def manageInput(workerStats: dict, startTime: float):
     while True:
         data = input()
         if data == "exit":
             logging.info("Closing the server...")
+            logging.info("Stats: " + str(aggregateStats(workerStats, startTime)))
+            for worker in workers:
+                worker.terminate()
             os._exit(0)
+        elif data == "stats":
+            print(aggregateStats(workerStats, startTime))
 
 
-def manageNetwork():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((HOST, PORT))
-        logging.info("Hanabi server started on " + HOST + ":" + str(PORT))
-        while True:
-            s.listen()
-            conn, addr = s.accept()
-            threading.Thread(target=manageConnection,
-                             args=(conn, addr)).start()
+async def manageNetwork():
+    server = await asyncio.start_server(manageConnection, HOST, PORT, reuse_address=True)
+    logging.info("Hanabi server started on " + HOST + ":" + str(PORT))
+    async with server:
+        await server.serve_forever()
 
 
-def start_server(nplayers):
-    global numPlayers
+def start_server(nplayers, numWorkers=1):
+    global numPlayers, replayWriter
     numPlayers = nplayers
     logging.basicConfig(filename="game.log", level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s',
                         datefmt="%m/%d/%Y %I:%M:%S %p")
     logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
-    threading.Thread(target=manageNetwork).start()
-    manageInput()
+    workerStats = {}
+    startTime = time.time()
+    channels = []
+    if numWorkers > 1:
+        statsQueue = multiprocessing.Queue()
+        for index in range(numWorkers):
+            # SEQPACKET keeps every handed over request in its own message, together with its socket
+            parentChannel, workerChannel = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            worker = multiprocessing.Process(target=runWorker, args=(index, workerChannel, statsQueue), daemon=True)
+            worker.start()
+            workerChannel.close()
+            workers.append(worker)
+            channels.append(parentChannel)
+        threading.Thread(target=collectStats, args=(statsQueue, workerStats), daemon=True).start()
+    threading.Thread(target=manageInput, args=(workerStats, startTime), daemon=True).start()
+    if not channels:
+        replayWriter = replay.ReplayWriter(replayPath)
+    if channels:
+        asyncio.run(acceptConnections(channels))
+    else:
+        asyncio.run(manageNetwork())
 
 
 if __name__ == '__main__':
@@ -169,5 +724,8 @@ if __name__ == '__main__':
     if len(sys.argv) > 1:
         if int(sys.argv[1]) > 1:
             numPlayers = int(sys.argv[1])
+    numWorkers = 1
+    if len(sys.argv) > 2:
+        numWorkers = max(1, int(sys.argv[2]))
 
-    start_server(numPlayers)
\ No newline at end of file
+    start_server(numPlayers, numWorkers)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Spectator: watches a room of the server without playing, printing the actions of the players.
+# Run with: python spectator.py <room> [name]
+
+import socket
+import sys
+
+import GameData
+from constants import *
+
+
+def describe(data: GameData.GameData) -> str:
+    if type(data) is GameData.ServerSpectatorConnectionOk:
+        return "Watching " + data.room + ", players: " + ", ".join(data.players)
+    elif type(data) is GameData.ServerStartGameData:
+        return "Game start between " + ", ".join(data.players)
+    elif type(data) is GameData.ServerActionValid:
+        return data.lastPlayer + " discarded " + data.card.toClientString() + ", now " + data.player
+    elif type(data) is GameData.ServerPlayerMoveOk:
+        return data.lastPlayer + " played " + data.card.toClientString() + ", now " + data.player
+    elif type(data) is GameData.ServerPlayerThunderStrike:
+        return data.lastPlayer + " failed to play " + data.card.toClientString() + ", now " + data.player
+    elif type(data) is GameData.ServerHintData:
+        return data.source + " hinted to " + data.destination + " the " + data.type + " " + str(data.value) + \
+               " in positions " + str(data.positions) + ", now " + data.player
+    elif type(data) is GameData.ServerGameOver:
+        return "Game over, score " + str(data.score) + ": " + data.scoreMessage
+    elif type(data) is GameData.ServerActionInvalid:
+        return data.message
+    return type(data).__name__
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python spectator.py <room> [name]")
+        exit(-1)
+    name = sys.argv[2] if len(sys.argv) > 2 else "spectator"
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.connect((HOST, PORT))
+        s.sendall(GameData.ClientSpectatorAddData(name, sys.argv[1]).serialize())
+        reader = GameData.FrameReader(s)
+        data = reader.recv()
+        while data is not None:
+            print(describe(data))
+            sys.stdout.flush()
+            data = reader.recv()
+        print("The room has been closed")
\ No newline at end of file
@@ -0,0 +1,54 @@
+# Tests of the agent state: many agents in the same process must not share anything
+# Run with: python -m pytest test_agent.py (or python -m unittest test_agent)
+
+import unittest
+
+import numpy as np
+
+import agent
+import runner
+
+
+class TestAgentInstances(unittest.TestCase):
+
+    def test_five_agents_in_one_process(self):
+        # every seat of the runner is built from the single agent module imported here
+        self.assertIs(runner.agent, agent)
+        first = runner.runGame(5, 3)
+        self.assertTrue(0 <= first["score"] <= 25)
+        # another game in between leaves nothing behind: the same seed replays the same game
+        runner.runGame(5, 4)
+        again = runner.runGame(5, 3)
+        self.assertEqual((first["score"], first["strikes"], first["actions"]),
+                         (again["score"], again["strikes"], again["actions"]))
+
+    def test_players_share_no_mutable_state(self):
+        a = agent.Player(4, "a", np.random.default_rng(0))
+        b = agent.Player(4, "b", np.random.default_rng(1))
+        for name in ("hand", "teammates", "teammateHands", "toServe", "states", "deckAvailableSelf",
+                     "deckAvailableOthers", "table", "memory", "population", "hintMoves"):
+            self.assertIsNot(getattr(a, name), getattr(b, name), name)
+        self.assertEqual(len(a.hand), 4)
+        self.assertEqual(len(b.hand), 4)
+        for card in a.hand:
+            self.assertNotIn(card, b.hand.cards)
+        self.assertFalse(np.shares_memory(a.hand.probs, b.hand.probs))
+
+        # changing one player does not change the other
+        a.table[0] = 3
+        a.memory.append(1)
+        a.teammates["c"] = []
+        a.deckAvailableSelf[0, 0] -= 1
+        a.deckAvailableOthers[0, 0] -= 1
+        a.updateStates()
+        self.assertEqual(b.table, [0, 0, 0, 0, 0])
+        self.assertEqual(b.memory, [])
+        self.assertEqual(b.teammates, {})
+        self.assertEqual(b.deckAvailableSelf[0, 0], 3)
+        self.assertEqual(b.deckAvailableOthers[0, 0], 3)
+        self.assertEqual(b.states[0, 0], 2)
+        self.assertNotEqual(a.states[0, 0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
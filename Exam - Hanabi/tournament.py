@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Tournament: many headless games, spread over all the cores, with statistics of the scores.
+# Run with: python tournament.py [players] [seeds] [processes]
+#   players: number of players of the tables, as a range or a list (2-5, 3, 2,4), default 2-5
+#   seeds: seeds of the games played for each number of players (0-99, 7, 1,5,9), default 0-99
+#   processes: size of the process pool, default the number of cores
+
+import logging
+import multiprocessing
+import statistics
+import sys
+import time
+import warnings
+
+import runner
+
+MAX_SCORE = 25
+
+
+
+#######################################################################################################################
+#
+# Function that parses a list of integers written as a range (first-last, both included) or separated by commas
+#
+# Args:
+#
+#   - text: the list, e.g. "2-5" or "2,4"
+#
+# Return:
+#
+#   - values: list of integers
+#
+#######################################################################################################################
+
+def parseRange(text):
+    if "-" in text:
+        first, last = text.split("-")
+        return list(range(int(first), int(last) + 1))
+    return [int(value) for value in text.split(",")]
+
+
+def quietWorker():
+    logging.disable(logging.WARNING) # the game logs every invalid action
+    warnings.filterwarnings("ignore", category=RuntimeWarning) # the agent counts cards in unsigned arrays
+
+
+
+#######################################################################################################################
+#
+# Function that plays the game of a seed, in a worker of the pool
+# The seed fixes both the deck shuffle and the random choices of the agents
+#
+# Args:
+#
+#   - task: tuple (numPlayers, seed)
+#
+# Return:
+#
+#   - result: result of runner.runGame with the number of players and the seed, or with the error of a failed game
+#
+#######################################################################################################################
+
+def playSeed(task):
+    numPlayers, seed = task
+    try:
+        result = runner.runGame(numPlayers, seed)
+    except Exception as e:
+        result = {"error": type(e).__name__ + ": " + str(e)}
+    result["numPlayers"] = numPlayers
+    result["seed"] = seed
+    return result
+
+
+
+#######################################################################################################################
+#
+# Function that computes the statistics of the games played with a number of players
+#
+# Args:
+#
+#   - results: results of playSeed
+#
+# Return:
+#
+#   - stats: dictionary with the number of games, failed games, mean and standard deviation of the scores,
+#     histogram of the scores (count for every score from 0 to 25), rate of perfect games and rate of games lost
+#     by using all the storm tokens
+#
+#######################################################################################################################
+
+def scoreStats(results):
+    played = [r for r in results if "error" not in r]
+    scores = [r["score"] for r in played]
+    histogram = [0] * (MAX_SCORE + 1)
+    for score in scores:
+        histogram[score] += 1
+    return {
+        "games": len(results),
+        "failed": len(results) - len(played),
+        "mean": statistics.mean(scores) if scores else 0,
+        "stdev": statistics.pstdev(scores) if scores else 0,
+        "histogram": histogram,
+        "perfect": histogram[MAX_SCORE] / len(played) if played else 0,
+        "strikeOut": sum(1 for r in played if r["strikes"] == 3) / len(played) if played else 0
+    }
+
+
+
+#######################################################################################################################
+#
+# Function that plays every seed with every number of players over a pool of processes
+#
+# Args:
+#
+#   - playerCounts: numbers of players of the tables (2 to 5)
+#   - seeds: seeds of the games
+#   - processes: size of the pool, None for the number of cores
+#
+# Return:
+#
+#   - stats: statistics of scoreStats by number of players
+#   - gamesPerSecond: games played per second, over all the pool
+#
+#######################################################################################################################
+
+def runTournament(playerCounts, seeds, processes=None):
+    tasks = [(numPlayers, seed) for numPlayers in playerCounts for seed in seeds]
+    results = {numPlayers: [] for numPlayers in playerCounts}
+    processes = processes or multiprocessing.cpu_count()
+    chunksize = max(1, len(tasks) // (8 * processes))  # small chunks, the games do not last the same
+    startTime = time.perf_counter()
+    with multiprocessing.Pool(processes, initializer=quietWorker) as pool:
+        for result in pool.imap_unordered(playSeed, tasks, chunksize):
+            results[result["numPlayers"]].append(result)
+    elapsed = time.perf_counter() - startTime
+    stats = {numPlayers: scoreStats(results[numPlayers]) for numPlayers in playerCounts}
+    return stats, len(tasks) / elapsed
+
+
+def printStats(stats, gamesPerSecond):
+    for numPlayers in stats:
+        s = stats[numPlayers]
+        print("%d players: %d games (%d failed), score %.2f +- %.2f, perfect %.1f%%, strike out %.1f%%" % (numPlayers,
+              s["games"], s["failed"], s["mean"], s["stdev"], s["perfect"] * 100, s["strikeOut"] * 100))
+        top = max(s["histogram"]) or 1
+        for score in range(MAX_SCORE + 1):
+            if s["histogram"][score]:
+                print("  %2d %5d %s" % (score, s["histogram"][score], "#" * (40 * s["histogram"][score] // top)))
+    print("%.1f games/s" % gamesPerSecond)
+
+
+if __name__ == '__main__':
+    quietWorker()
+    playerCounts = parseRange(sys.argv[1]) if len(sys.argv) > 1 else [2, 3, 4, 5]
+    seeds = parseRange(sys.argv[2]) if len(sys.argv) > 2 else list(range(100))
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    if any(numPlayers < 2 or numPlayers > 5 for numPlayers in playerCounts):
+        print("The number of players must be between 2 and 5")
+        exit(-1)
+    printStats(*runTournament(playerCounts, seeds, processes))